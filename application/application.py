@@ -1,5 +1,6 @@
 import ctypes
-from imgui_bundle import imgui
+import time
+from imgui_bundle import imgui, implot
 import sdl2
 import OpenGL.GL as gl
 
@@ -10,21 +11,54 @@ from computation.parameters import (
     LandmarkParameter,
     BaseParameter,
     LandmarkCalculateOption,
+    GeometryBackend,
     ParameterType,
     Parameter,
 )
 from computation.compute_parameters import ParameterComputer
+from computation.output_filter import FilterOptions, FilterType
+from computation.blendshape_names import BLENDSHAPE_NAMES
+from application.landmark_renderer import LandmarkRenderer
+
+# Redraw at least this often even if nothing happened
+IDLE_REDRAW_SEC = 1.0
+# Frames drawn after an input event so ImGui can settle hover and focus
+INPUT_REDRAW_FRAMES = 3
+HISTORY_PLOT_HEIGHT = 250
 
 
 class Application:
-    def __init__(self):
+    """GUI that only redraws on input events or new tracking results.
+
+    Results are picked up at most results_fps times a second, the whole
+    GUI is drawn at most max_fps times a second.
+    """
+
+    def __init__(self, max_fps: float = 60, results_fps: float = 30):
         imgui.create_context()
+        implot.create_context()
         self.window, self.gl_context = self.impl_pysdl2_init()
         self.impl = SDL2Renderer(self.window)
         self.event = sdl2.SDL_Event()
         self.should_close = False
+        self.landmark_renderer = LandmarkRenderer()
+
+        self.frame_interval = 1 / max_fps
+        self.results_interval = 1 / results_fps
+        self.results_event_type = sdl2.SDL_RegisterEvents(1)
+        if self.results_event_type == 0xFFFFFFFF:
+            raise Exception("Error: Out of SDL user events")
+        self.results_event_posted = False
+        self.results_pending = True
+        self.results = None
+        self.input_frames = INPUT_REDRAW_FRAMES
+        self.last_frame_time = 0.0
+        self.next_frame_time = 0.0
+        self.next_results_time = 0.0
 
     def __del__(self):
+        if self.landmark_renderer:
+            self.landmark_renderer.shutdown()
         if self.impl:
             self.impl.shutdown()
         if self.gl_context:
@@ -95,12 +129,68 @@ class Application:
 
         return window, gl_context
 
-    def render_frame(self, computer: ParameterComputer):
-        while sdl2.SDL_PollEvent(ctypes.byref(self.event)) != 0:
-            if self.event.type == sdl2.SDL_QUIT:
-                self.should_close = True
+    def notify_results(self):
+        """Wakes the render loop, safe to call from any thread."""
+        if self.results_event_posted:
+            return
+        self.results_event_posted = True
+        event = sdl2.SDL_Event()
+        event.type = self.results_event_type
+        if sdl2.SDL_PushEvent(ctypes.byref(event)) != 1:
+            # Failed or filtered, the next wake up shows the results
+            self.results_event_posted = False
+            self.results_pending = True
+
+    def handle_event(self, event):
+        if event.type == sdl2.SDL_QUIT:
+            self.should_close = True
+        elif event.type == self.results_event_type:
+            self.results_event_posted = False
+            self.results_pending = True
+        else:
+            self.impl.process_event(event)
+            self.input_frames = INPUT_REDRAW_FRAMES
+
+    def next_draw_time(self):
+        draw_time = self.last_frame_time + IDLE_REDRAW_SEC
+        if self.input_frames > 0:
+            draw_time = min(draw_time, self.next_frame_time)
+        if self.results_pending:
+            draw_time = min(
+                draw_time, max(self.next_frame_time, self.next_results_time)
+            )
+        return draw_time
+
+    def wait_for_frame(self):
+        # Blocks on SDL events until input, results or the idle redraw
+        # make a new frame due
+        while not self.should_close:
+            timeout = self.next_draw_time() - time.perf_counter()
+            if timeout <= 0:
                 return
-            self.impl.process_event(self.event)
+            if (
+                sdl2.SDL_WaitEventTimeout(
+                    ctypes.byref(self.event), max(1, int(timeout * 1000))
+                )
+                == 0
+            ):
+                continue
+            self.handle_event(self.event)
+            while sdl2.SDL_PollEvent(ctypes.byref(self.event)) != 0:
+                self.handle_event(self.event)
+
+    def render_frame(self, computer: ParameterComputer):
+        self.wait_for_frame()
+        if self.should_close:
+            return
+        now = time.perf_counter()
+        if self.results_pending and now >= self.next_results_time:
+            self.results_pending = False
+            self.results = computer.get_results()
+            self.next_results_time = now + self.results_interval
+        self.input_frames = max(self.input_frames - 1, 0)
+        self.last_frame_time = now
+        self.next_frame_time = now + self.frame_interval
         self.impl.process_inputs()
 
         imgui.new_frame()
@@ -115,127 +205,108 @@ class Application:
 
     def draw_windows(self, computer: ParameterComputer):
         self.draw_parameter_window(computer.parameter_configs, computer)
-        results = computer.get_results()
+        results = self.results
         blendshapes = None
         outputs = None
         landmarks = None
+        timestamp = None
         if results is not None:
             blendshapes = results.blendshapes
             outputs = results.outputs
             landmarks = results.landmarks
+            timestamp = results.timestamp
 
-        self.draw_blendshapes(blendshapes)
-        self.draw_outputs(outputs)
-        self.draw_landmarks(landmarks)
-
-    def draw_landmark_set(self, x, y, offsets, draw_list, landmarks, color):
-        for point in landmarks:
-            center = imgui.ImVec2(
-                x + ((offsets[0] - point[0])) * 1000,
-                y + (point[1] - offsets[1]) * 1000,
-            )
-            draw_list.add_circle_filled(
-                center,
-                1,
-                color,
-            )
+        self.draw_blendshapes(blendshapes, computer.history)
+        self.draw_outputs(outputs, computer.history)
+        self.draw_landmarks(landmarks, timestamp)
 
     def get_landmark_offset(self, landmarks):
-        num_landmarks = len(landmarks["all_xy"])
-        if num_landmarks <= 0:
+        all_points = landmarks["all_xy"]
+        if len(all_points) <= 0:
             return (0.0, 0.0)
-        sum_x = 0
-        sum_y = 0
-        for point in landmarks["all_xy"]:
-            sum_x += point[0]
-            sum_y += point[1]
-        sum_x = sum_x / num_landmarks
-        sum_y = sum_y / num_landmarks
-        return (sum_x, sum_y)
-
-    def draw_landmarks(self, landmarks):
+        sum_x, sum_y = all_points.mean(axis=0)
+        return (float(sum_x), float(sum_y))
+
+    def draw_landmarks(self, landmarks, timestamp):
         if imgui.begin("Landmarks Window")[0]:
             if landmarks is None:
                 imgui.text("No Landmark Data Available")
             else:
-                draw_list = imgui.get_window_draw_list()
-                x, y = imgui.get_cursor_screen_pos()
-                w_size_x, w_size_y = imgui.get_window_size()
-                x += w_size_x // 2
-                y += w_size_y // 2
-                offsets = self.get_landmark_offset(landmarks)
-                self.draw_landmark_set(
-                    x,
-                    y,
-                    offsets,
-                    draw_list,
-                    landmarks["all_xy"],
-                    imgui.get_color_u32(imgui.ImVec4(1, 1, 0, 1)),
-                )
-                self.draw_landmark_set(
-                    x,
-                    y,
-                    offsets,
-                    draw_list,
-                    landmarks["lips_xy"],
-                    imgui.get_color_u32(imgui.ImVec4(1, 0, 0, 1)),
+                width, height = imgui.get_content_region_avail()
+                self.landmark_renderer.update(
+                    landmarks,
+                    self.get_landmark_offset(landmarks),
+                    timestamp,
+                    width,
+                    height,
                 )
-                self.draw_landmark_set(
-                    x,
-                    y,
-                    offsets,
-                    draw_list,
-                    landmarks["left_eye_xy"],
-                    imgui.get_color_u32(imgui.ImVec4(1, 0, 0, 1)),
-                )
-                self.draw_landmark_set(
-                    x,
-                    y,
-                    offsets,
-                    draw_list,
-                    landmarks["right_eye_xy"],
-                    imgui.get_color_u32(imgui.ImVec4(1, 0, 0, 1)),
-                )
-                self.draw_landmark_set(
-                    x,
-                    y,
-                    offsets,
-                    draw_list,
-                    landmarks["left_eyebrow_xy"],
-                    imgui.get_color_u32(imgui.ImVec4(1, 0, 0, 1)),
-                )
-                self.draw_landmark_set(
-                    x,
-                    y,
-                    offsets,
-                    draw_list,
-                    landmarks["right_eyebrow_xy"],
-                    imgui.get_color_u32(imgui.ImVec4(1, 0, 0, 1)),
+                # Flipped, GL textures start at the bottom row
+                imgui.image(
+                    imgui.ImTextureRef(self.landmark_renderer.texture),
+                    imgui.ImVec2(*self.landmark_renderer.size),
+                    imgui.ImVec2(0, 1),
+                    imgui.ImVec2(1, 0),
                 )
         imgui.end()
 
-    def draw_outputs(self, outputs):
+    def draw_history(self, plot_id, times, rows, names, offset, y_limits=None):
+        # Rows are plotted in place, the offset unwraps the ring buffer
+        if len(times) == 0:
+            return
+        oldest = times[offset % len(times)]
+        latest = times[(offset - 1) % len(times)]
+        if implot.begin_plot(plot_id, imgui.ImVec2(-1, HISTORY_PLOT_HEIGHT)):
+            y_flags = implot.AxisFlags_.auto_fit if y_limits is None else 0
+            implot.setup_axes("s", "", 0, y_flags)
+            implot.setup_axis_limits(
+                implot.ImAxis_.x1, oldest, latest, implot.Cond_.always
+            )
+            if y_limits is not None:
+                implot.setup_axis_limits(implot.ImAxis_.y1, *y_limits)
+            for name, row in zip(names, rows):
+                # Too many to show at once, picked from the legend
+                if y_limits is not None:
+                    implot.hide_next_item()
+                implot.plot_line(name, times, row, offset=offset)
+            implot.end_plot()
+
+    def draw_outputs(self, outputs, history=None):
         if imgui.begin("Output Window")[0]:
             if outputs is None:
                 imgui.text("No Output Data Available")
             else:
+                if history is not None:
+                    times, rows, _, output_ids, offset = history.view()
+                    self.draw_history(
+                        "##Output History", times, rows, output_ids, offset
+                    )
                 for result in outputs:
                     imgui.text(result["id"])
                     imgui.same_line()
                     imgui.text(f"{result["value"]:.3f}")
         imgui.end()
 
-    def draw_blendshapes(self, blendshapes):
+    def draw_blendshapes(self, blendshapes, history=None):
         if imgui.begin("Blendshape Window")[0]:
             style_color = imgui.ImVec4(0.6, 0.0, 0.4, 1.0)
             imgui.push_style_color(imgui.Col_.plot_histogram, style_color)
             if blendshapes is None:
                 imgui.text("No Blendshape Results Available")
             else:
-                for blendshape_name in blendshapes:
-                    imgui.progress_bar(
-                        blendshapes[blendshape_name], overlay=blendshape_name
+                if history is not None:
+                    times, _, rows, _, offset = history.view()
+                    self.draw_history(
+                        "##Blendshape History",
+                        times,
+                        rows,
+                        BLENDSHAPE_NAMES,
+                        offset,
+                        (0, 1),
                     )
+                for blendshape_name, score in zip(
+                    BLENDSHAPE_NAMES, blendshapes.tolist()
+                ):
+                    imgui.progress_bar(score, overlay=blendshape_name)
             imgui.pop_style_color()
         imgui.end()
 
@@ -262,6 +333,34 @@ class Application:
                 parameter.min_val = min(new_min, parameter.max_val)
             if changed_max:
                 parameter.max_val = max(new_max, parameter.min_val)
+        self.draw_smoothing_group(parameter.name, parameter.smoothing)
+
+    def draw_smoothing_group(self, name, smoothing: FilterOptions):
+        filter_types = list(FilterType)
+        changed, filter_idx = imgui.combo(
+            f"{name} Smoothing",
+            filter_types.index(smoothing.filter_type),
+            [filter_type.name for filter_type in filter_types],
+        )
+        if changed:
+            smoothing.filter_type = filter_types[filter_idx]
+        match smoothing.filter_type:
+            case FilterType.ONE_EURO:
+                _, smoothing.min_cutoff = imgui.input_float(
+                    f"{name} Min Cutoff Hz: ", smoothing.min_cutoff
+                )
+                _, smoothing.beta = imgui.input_float(
+                    f"{name} Beta: ", smoothing.beta
+                )
+            case FilterType.KALMAN:
+                _, smoothing.process_noise = imgui.input_float(
+                    f"{name} Process Noise: ", smoothing.process_noise
+                )
+                _, smoothing.measurement_noise = imgui.input_float(
+                    f"{name} Measurement Noise: ",
+                    smoothing.measurement_noise,
+                    format="%.6f",
+                )
 
     def draw_blendshape_group(self, blendshape_param: BlendshapeParameter):
         expanded = imgui.collapsing_header(
@@ -317,6 +416,20 @@ class Application:
                         self.draw_landmark_group(parameter.parameter)
                 imgui.separator()
 
+            self.draw_smoothing_group("Face Pose", configs.pose_smoothing)
+
+            changed, use_fast = imgui.checkbox(
+                "fast geometry",
+                configs.geometry_backend == GeometryBackend.FAST,
+            )
+            if changed:
+                configs.geometry_backend = (
+                    GeometryBackend.FAST
+                    if use_fast
+                    else GeometryBackend.REFERENCE
+                )
+                configs.mark_changed()
+
             if imgui.button("reset"):
                 configs.config_reset()
             if imgui.button("set defaults"):
@@ -340,6 +453,7 @@ class Application:
                     output.get("FaceAngleY", 0) + curr_rot_of[1],
                     output.get("FaceAngleZ", 0) + curr_rot_of[2],
                 )
+                configs.mark_changed()
                 configs.file_save()
         imgui.end()
 
@@ -0,0 +1,222 @@
+import ctypes
+import numpy as np
+import OpenGL.GL as gl
+from OpenGL.GL.shaders import compileProgram, compileShader
+from computation.landmark_parser import LANDMARK_SET_INDEXERS, NUM_LANDMARKS
+
+# Pixels per normalized image unit, as the per-point ImGui overlay had
+LANDMARK_SCALE = 1000
+POINT_SIZE = 2.0
+ALL_COLOR = (1.0, 1.0, 0.0)
+FEATURE_COLOR = (1.0, 0.0, 0.0)
+# Drawn over the full mesh in FEATURE_COLOR
+FEATURE_SETS = (
+    "lips_xy",
+    "left_eye_xy",
+    "right_eye_xy",
+    "left_eyebrow_xy",
+    "right_eyebrow_xy",
+)
+
+VERTEX_SHADER = """
+#version 410 core
+uniform vec2 Offset;
+uniform vec2 Scale;
+uniform float PointSize;
+layout (location = 0) in vec2 Position;
+layout (location = 1) in vec3 Color;
+out vec3 Frag_Color;
+void main()
+{
+    Frag_Color = Color;
+    gl_PointSize = PointSize;
+    gl_Position = vec4((Position - Offset) * Scale, 0, 1);
+}
+"""
+
+FRAGMENT_SHADER = """
+#version 410 core
+in vec3 Frag_Color;
+layout (location = 0) out vec4 Out_Color;
+void main()
+{
+    Out_Color = vec4(Frag_Color, 1);
+}
+"""
+
+
+def build_draw_rows():
+    rows = [np.arange(NUM_LANDMARKS, dtype=np.intp)]
+    for landmark_set_name in FEATURE_SETS:
+        rows.append(LANDMARK_SET_INDEXERS[landmark_set_name][0].ravel())
+    colors = np.empty((sum(len(r) for r in rows), 3), dtype=np.float32)
+    colors[:NUM_LANDMARKS] = ALL_COLOR
+    colors[NUM_LANDMARKS:] = FEATURE_COLOR
+    return np.concatenate(rows), colors
+
+
+class LandmarkRenderer:
+    """Draws the landmark overlay into a texture with a point shader.
+
+    Points for the full mesh and the feature sets are gathered with one
+    index into a single vertex buffer and drawn with one call. The texture
+    is only redrawn when a new result or a new size arrives, every other
+    GUI frame just shows it with imgui.image.
+    """
+
+    def __init__(self):
+        self.draw_rows, colors = build_draw_rows()
+        self.program = compileProgram(
+            compileShader(VERTEX_SHADER, gl.GL_VERTEX_SHADER),
+            compileShader(FRAGMENT_SHADER, gl.GL_FRAGMENT_SHADER),
+            validate=False,
+        )
+        self.offset_location = gl.glGetUniformLocation(self.program, "Offset")
+        self.scale_location = gl.glGetUniformLocation(self.program, "Scale")
+        self.point_size_location = gl.glGetUniformLocation(
+            self.program, "PointSize"
+        )
+
+        last_vertex_array = gl.glGetIntegerv(gl.GL_VERTEX_ARRAY_BINDING)
+        last_array_buffer = gl.glGetIntegerv(gl.GL_ARRAY_BUFFER_BINDING)
+        self.vertex_array = gl.glGenVertexArrays(1)
+        gl.glBindVertexArray(self.vertex_array)
+        self.position_buffer = gl.glGenBuffers(1)
+        gl.glBindBuffer(gl.GL_ARRAY_BUFFER, self.position_buffer)
+        gl.glBufferData(
+            gl.GL_ARRAY_BUFFER,
+            len(self.draw_rows) * 2 * 4,
+            None,
+            gl.GL_DYNAMIC_DRAW,
+        )
+        gl.glEnableVertexAttribArray(0)
+        gl.glVertexAttribPointer(
+            0, 2, gl.GL_FLOAT, gl.GL_FALSE, 0, ctypes.c_void_p(0)
+        )
+        # Colors never change, upload them once
+        self.color_buffer = gl.glGenBuffers(1)
+        gl.glBindBuffer(gl.GL_ARRAY_BUFFER, self.color_buffer)
+        gl.glBufferData(
+            gl.GL_ARRAY_BUFFER, colors.nbytes, colors, gl.GL_STATIC_DRAW
+        )
+        gl.glEnableVertexAttribArray(1)
+        gl.glVertexAttribPointer(
+            1, 3, gl.GL_FLOAT, gl.GL_FALSE, 0, ctypes.c_void_p(0)
+        )
+        gl.glBindVertexArray(last_vertex_array)
+        gl.glBindBuffer(gl.GL_ARRAY_BUFFER, last_array_buffer)
+
+        self.framebuffer = gl.glGenFramebuffers(1)
+        self.texture = None
+        self.size = (0, 0)
+        self.drawn_key = None
+        self.positions = np.empty((len(self.draw_rows), 2), dtype=np.float32)
+
+    def resize(self, width, height):
+        last_texture = gl.glGetIntegerv(gl.GL_TEXTURE_BINDING_2D)
+        last_framebuffer = gl.glGetIntegerv(gl.GL_FRAMEBUFFER_BINDING)
+        if self.texture is not None:
+            gl.glDeleteTextures([self.texture])
+        self.texture = gl.glGenTextures(1)
+        gl.glBindTexture(gl.GL_TEXTURE_2D, self.texture)
+        gl.glTexParameteri(
+            gl.GL_TEXTURE_2D, gl.GL_TEXTURE_MIN_FILTER, gl.GL_NEAREST
+        )
+        gl.glTexParameteri(
+            gl.GL_TEXTURE_2D, gl.GL_TEXTURE_MAG_FILTER, gl.GL_NEAREST
+        )
+        gl.glTexImage2D(
+            gl.GL_TEXTURE_2D,
+            0,
+            gl.GL_RGBA,
+            width,
+            height,
+            0,
+            gl.GL_RGBA,
+            gl.GL_UNSIGNED_BYTE,
+            None,
+        )
+        gl.glBindFramebuffer(gl.GL_FRAMEBUFFER, self.framebuffer)
+        gl.glFramebufferTexture2D(
+            gl.GL_FRAMEBUFFER,
+            gl.GL_COLOR_ATTACHMENT0,
+            gl.GL_TEXTURE_2D,
+            self.texture,
+            0,
+        )
+        status = gl.glCheckFramebufferStatus(gl.GL_FRAMEBUFFER)
+        gl.glBindFramebuffer(gl.GL_FRAMEBUFFER, last_framebuffer)
+        gl.glBindTexture(gl.GL_TEXTURE_2D, last_texture)
+        if status != gl.GL_FRAMEBUFFER_COMPLETE:
+            raise Exception(f"Error: Landmark framebuffer incomplete {status}")
+        self.size = (width, height)
+
+    def update(self, landmarks, offsets, timestamp, width, height):
+        """Redraws the texture if the result or the size changed."""
+        width = max(int(width), 1)
+        height = max(int(height), 1)
+        if (width, height) != self.size:
+            self.resize(width, height)
+        key = (timestamp, width, height)
+        if key == self.drawn_key:
+            return
+        self.drawn_key = key
+
+        np.take(
+            landmarks.points[:, :2], self.draw_rows, axis=0, out=self.positions
+        )
+        self.draw(offsets, width, height)
+
+    def draw(self, offsets, width, height):
+        last_framebuffer = gl.glGetIntegerv(gl.GL_FRAMEBUFFER_BINDING)
+        last_viewport = gl.glGetIntegerv(gl.GL_VIEWPORT)
+        last_program = gl.glGetIntegerv(gl.GL_CURRENT_PROGRAM)
+        last_vertex_array = gl.glGetIntegerv(gl.GL_VERTEX_ARRAY_BINDING)
+        last_array_buffer = gl.glGetIntegerv(gl.GL_ARRAY_BUFFER_BINDING)
+        last_scissor_test = gl.glIsEnabled(gl.GL_SCISSOR_TEST)
+        last_blend = gl.glIsEnabled(gl.GL_BLEND)
+        last_program_point_size = gl.glIsEnabled(gl.GL_PROGRAM_POINT_SIZE)
+
+        gl.glBindFramebuffer(gl.GL_FRAMEBUFFER, self.framebuffer)
+        gl.glViewport(0, 0, width, height)
+        gl.glDisable(gl.GL_SCISSOR_TEST)
+        gl.glDisable(gl.GL_BLEND)
+        gl.glEnable(gl.GL_PROGRAM_POINT_SIZE)
+        gl.glClearColor(0, 0, 0, 0)
+        gl.glClear(gl.GL_COLOR_BUFFER_BIT)
+
+        gl.glBindBuffer(gl.GL_ARRAY_BUFFER, self.position_buffer)
+        gl.glBufferSubData(
+            gl.GL_ARRAY_BUFFER, 0, self.positions.nbytes, self.positions
+        )
+        gl.glUseProgram(self.program)
+        gl.glUniform2f(self.offset_location, offsets[0], offsets[1])
+        # Mirrored horizontally, image y points down
+        gl.glUniform2f(
+            self.scale_location,
+            -2 * LANDMARK_SCALE / width,
+            -2 * LANDMARK_SCALE / height,
+        )
+        gl.glUniform1f(self.point_size_location, POINT_SIZE)
+        gl.glBindVertexArray(self.vertex_array)
+        gl.glDrawArrays(gl.GL_POINTS, 0, len(self.draw_rows))
+
+        gl.glBindVertexArray(last_vertex_array)
+        gl.glBindBuffer(gl.GL_ARRAY_BUFFER, last_array_buffer)
+        gl.glUseProgram(last_program)
+        gl.glBindFramebuffer(gl.GL_FRAMEBUFFER, last_framebuffer)
+        gl.glViewport(*last_viewport)
+        if last_scissor_test:
+            gl.glEnable(gl.GL_SCISSOR_TEST)
+        if last_blend:
+            gl.glEnable(gl.GL_BLEND)
+        if not last_program_point_size:
+            gl.glDisable(gl.GL_PROGRAM_POINT_SIZE)
+
+    def shutdown(self):
+        if self.texture is not None:
+            gl.glDeleteTextures([self.texture])
+        gl.glDeleteFramebuffers(1, [self.framebuffer])
+        gl.glDeleteBuffers(2, [self.position_buffer, self.color_buffer])
+        gl.glDeleteVertexArrays(1, [self.vertex_array])
+        gl.glDeleteProgram(self.program)
@@ -0,0 +1,83 @@
+"""Per-frame cost of the landmark geometry backends.
+
+Runs the default landmark parameters over synthetic frames with both the
+reference (skimage / scipy) and fast (NumPy) backends and reports the
+per-frame cost and the largest deviation between the two.
+
+    python -m benchmarks.bench_geometry --frames 2000
+"""
+
+import argparse
+import time
+import numpy as np
+from benchmarks.synthetic import synthetic_frames
+from computation.geometry_cache import GeometryCache
+from computation.landmark_parser import LandmarkParser
+from computation.parameter_config import ParameterConfigs
+from computation.parameters import GeometryBackend, ParameterType
+
+
+def landmark_parameters():
+    # An empty path skips any parameters.json so the defaults are measured
+    configs = ParameterConfigs(params_file="")
+    return [
+        parameter.parameter
+        for parameter in configs.parameters
+        if parameter.parameter_type == ParameterType.LANDMARK
+    ]
+
+
+def run_backend(frames, parameters, backend):
+    landmark_sets = [
+        LandmarkParser(points).get_landmark_sets() for points in frames
+    ]
+    cache = GeometryCache()
+    values = np.empty((len(frames), len(parameters)))
+    start = time.perf_counter_ns()
+    for frame_idx, frame_sets in enumerate(landmark_sets):
+        cache.new_frame(frame_sets)
+        for param_idx, parameter in enumerate(parameters):
+            parameter.compute_value(frame_sets, cache, backend)
+            values[frame_idx, param_idx] = parameter.value
+    elapsed_ns = time.perf_counter_ns() - start
+    return values, elapsed_ns / len(frames) / 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--frames", type=int, default=2000)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    frames = synthetic_frames(args.frames, args.seed)
+    parameters = landmark_parameters()
+
+    # Warm up imports and lazily initialized code paths
+    run_backend(frames[:10], parameters, GeometryBackend.REFERENCE)
+    run_backend(frames[:10], parameters, GeometryBackend.FAST)
+
+    reference, reference_us = run_backend(
+        frames, parameters, GeometryBackend.REFERENCE
+    )
+    fast, fast_us = run_backend(frames, parameters, GeometryBackend.FAST)
+
+    print(f"frames: {args.frames}, landmark parameters: {len(parameters)}")
+    print(f"reference: {reference_us:8.1f} us/frame")
+    print(f"fast:      {fast_us:8.1f} us/frame")
+    print(f"speedup:   {reference_us / fast_us:8.1f}x")
+    print()
+    print(
+        f"{'parameter':<24}{'calculation':<18}"
+        f"{'max abs diff':>14}{'max rel diff':>14}"
+    )
+    for param_idx, parameter in enumerate(parameters):
+        deviation = np.abs(reference[:, param_idx] - fast[:, param_idx])
+        relative = deviation / np.abs(reference[:, param_idx])
+        print(
+            f"{parameter.name:<24}{parameter.calculate_option.name:<18}"
+            f"{np.max(deviation):>14.3g}{np.max(relative):>14.3g}"
+        )
+
+
+if __name__ == "__main__":
+    main()
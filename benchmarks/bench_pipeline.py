@@ -0,0 +1,221 @@
+"""Per-stage cost of the parameter pipeline on synthetic detection results.
+
+Times each stage of ParameterComputer.compute_parameters separately, then
+the whole call while the parameter count is scaled up from the defaults
+by duplicating them. Allocation figures are the tracemalloc peak above
+the starting point, averaged per frame, measured in a separate pass.
+
+    python -m benchmarks.bench_pipeline --frames 1000 --scales 1,4,16,32
+"""
+
+import argparse
+import time
+import tracemalloc
+from benchmarks.synthetic import synthetic_results
+from communication.injection_serializer import InjectParameterSerializer
+from computation.compute_parameters import ParameterComputer
+from computation.geometry_cache import GeometryCache
+from computation.landmark_parser import LandmarkParser
+from computation.output_filter import FilterType, OutputFilter
+from computation.parameter_config import ParameterConfigs
+from computation.parameters import (
+    GeometryBackend,
+    LandmarkCalculateOption,
+    Parameter,
+    ParameterType,
+)
+
+
+def scaled_configs(scale, backend):
+    # An empty path skips any parameters.json so the defaults are measured
+    configs = ParameterConfigs(params_file="")
+    defaults = list(configs.parameters)
+    for copy_idx in range(1, scale):
+        for parameter in defaults:
+            data = parameter.serialize()
+            data["name"] = f"{data['name']} {copy_idx}"
+            data["output_id"] = f"{data['output_id']}{copy_idx}"
+            configs.parameters.append(Parameter(**data))
+    configs.geometry_backend = backend
+    configs.mark_changed()
+    return configs
+
+
+def time_stage(run, num_frames):
+    start = time.perf_counter_ns()
+    for frame_idx in range(num_frames):
+        run(frame_idx)
+    return (time.perf_counter_ns() - start) / num_frames / 1000
+
+
+def allocated_per_frame(run, num_frames):
+    tracemalloc.start()
+    total_bytes = 0
+    for frame_idx in range(num_frames):
+        before, _ = tracemalloc.get_traced_memory()
+        tracemalloc.reset_peak()
+        run(frame_idx)
+        _, peak = tracemalloc.get_traced_memory()
+        total_bytes += peak - before
+    tracemalloc.stop()
+    return total_bytes / num_frames
+
+
+def print_row(name, us_per_frame, bytes_per_frame):
+    print(
+        f"{name:<40}{1e6 / us_per_frame:>12.0f}{us_per_frame:>12.1f}"
+        f"{bytes_per_frame / 1024:>12.1f}"
+    )
+
+
+def print_header(first_column):
+    print(
+        f"{first_column:<40}{'frames/s':>12}{'us/frame':>12}"
+        f"{'KiB/frame':>12}"
+    )
+
+
+def stage_runs(results, backend):
+    computer = ParameterComputer()
+    configs = scaled_configs(1, backend)
+    computer.parameter_configs = configs
+    cache = GeometryCache()
+
+    landmark_sets = [
+        LandmarkParser(result.face_landmarks[0]).get_landmark_sets()
+        for result in results
+    ]
+    vectors = [
+        computer.create_blendshapes_vector(result.face_blendshapes[0])
+        for result in results
+    ]
+    score_dicts = [
+        {
+            shape.category_name: shape.score
+            for shape in result.face_blendshapes[0]
+        }
+        for result in results
+    ]
+    outputs = [
+        computer.compute_parameters(result, frame_idx)
+        for frame_idx, result in enumerate(results)
+    ]
+    serializer = InjectParameterSerializer(configs.output_ids)
+
+    runs = {
+        "LandmarkParser": lambda idx: LandmarkParser(
+            results[idx].face_landmarks[0]
+        ).get_landmark_sets(),
+        "create_blendshapes_vector": lambda idx: (
+            computer.create_blendshapes_vector(
+                results[idx].face_blendshapes[0]
+            )
+        ),
+    }
+
+    for option in LandmarkCalculateOption:
+        parameters = [
+            parameter.parameter
+            for parameter in configs.parameters
+            if parameter.parameter_type == ParameterType.LANDMARK
+            and parameter.parameter.calculate_option == option
+        ]
+        if len(parameters) == 0:
+            continue
+
+        def run_option(idx, parameters=parameters):
+            cache.new_frame(landmark_sets[idx])
+            for parameter in parameters:
+                parameter.compute_value(landmark_sets[idx], cache, backend)
+
+        runs[f"{option.name} x{len(parameters)}"] = run_option
+
+    blendshape_parameters = [
+        parameter.parameter
+        for parameter in configs.parameters
+        if parameter.parameter_type == ParameterType.BLENDSHAPE
+    ]
+
+    def run_blendshape_parameters(idx):
+        for parameter in blendshape_parameters:
+            parameter.compute_value(score_dicts[idx])
+
+    runs[
+        f"BlendshapeParameter.compute_value x{len(blendshape_parameters)}"
+    ] = run_blendshape_parameters
+    runs["BlendshapePlan.compute"] = lambda idx: (
+        configs.blendshape_plan.compute(vectors[idx])
+    )
+    runs["compute_translation_rotation"] = lambda idx: (
+        computer.compute_translation_rotation(
+            results[idx].facial_transformation_matrixes[0]
+        )
+    )
+    smoothed_configs = scaled_configs(1, backend)
+    for options in smoothed_configs.output_smoothing:
+        options.filter_type = FilterType.ONE_EURO
+    output_filter = OutputFilter()
+    runs["OutputFilter.apply (One Euro)"] = lambda idx: output_filter.apply(
+        smoothed_configs, outputs[idx].values, idx * 33
+    )
+    runs["InjectParameterSerializer"] = lambda idx: serializer.serialize(
+        f"request-{idx}", outputs[idx].values
+    )
+    runs["compute_parameters (total)"] = lambda idx: (
+        computer.compute_parameters(results[idx], idx)
+    )
+    return runs
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--frames", type=int, default=1000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument(
+        "--scales",
+        default="1,4,16,32",
+        help="comma separated multiples of the default parameters",
+    )
+    parser.add_argument("--fast-geometry", default=False, action="store_true")
+    args = parser.parse_args()
+
+    backend = GeometryBackend.REFERENCE
+    if args.fast_geometry:
+        backend = GeometryBackend.FAST
+    results = synthetic_results(args.frames, args.seed)
+
+    print(f"frames: {args.frames}, geometry backend: {backend.name}")
+    print()
+    print_header("stage")
+    for name, run in stage_runs(results, backend).items():
+        # Warm up lazily initialized code paths
+        for frame_idx in range(min(10, args.frames)):
+            run(frame_idx)
+        us_per_frame = time_stage(run, args.frames)
+        print_row(name, us_per_frame, allocated_per_frame(run, args.frames))
+
+    print()
+    print(
+        f"{'parameters':<12}{'frames/s':>12}{'us/frame':>12}"
+        f"{'us/param':>12}{'KiB/frame':>12}"
+    )
+    for scale in [int(scale) for scale in args.scales.split(",")]:
+        computer = ParameterComputer()
+        computer.parameter_configs = scaled_configs(scale, backend)
+        num_parameters = len(computer.parameter_configs.parameters)
+
+        def run(idx):
+            computer.compute_parameters(results[idx], idx)
+
+        run(0)
+        us_per_frame = time_stage(run, args.frames)
+        bytes_per_frame = allocated_per_frame(run, args.frames)
+        print(
+            f"{num_parameters:<12}{1e6 / us_per_frame:>12.0f}"
+            f"{us_per_frame:>12.1f}{us_per_frame / num_parameters:>12.2f}"
+            f"{bytes_per_frame / 1024:>12.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
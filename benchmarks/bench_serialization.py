@@ -0,0 +1,82 @@
+"""Cost of building InjectParameterDataRequest messages.
+
+Compares the per-frame nested dict + json.dumps request against the
+precompiled InjectParameterSerializer template for the default outputs.
+
+    python -m benchmarks.bench_serialization --frames 20000
+"""
+
+import argparse
+import json
+import time
+import numpy as np
+from communication.injection_serializer import InjectParameterSerializer
+from computation.parameter_config import ParameterConfigs
+
+
+def json_request(request_id, output_ids, values):
+    # The request as it was built before the serializer existed
+    request = {
+        "apiName": "VTubeStudioPublicAPI",
+        "apiVersion": "1.0",
+        "requestID": request_id,
+        "messageType": "InjectParameterDataRequest",
+        "data": {
+            "faceFound": True,
+            "mode": "add",
+            "parameterValues": [
+                {"id": output_id, "value": value}
+                for output_id, value in zip(output_ids, values)
+            ],
+        },
+    }
+    return json.dumps(request)
+
+
+def time_path(serialize, frames):
+    num_bytes = 0
+    start = time.perf_counter_ns()
+    for frame_idx, values in enumerate(frames):
+        num_bytes += len(serialize(f"request-{frame_idx}", values))
+    elapsed_ns = time.perf_counter_ns() - start
+    us_per_frame = elapsed_ns / len(frames) / 1000
+    bytes_per_sec = num_bytes / (elapsed_ns / 1e9)
+    return us_per_frame, num_bytes / len(frames), bytes_per_sec
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--frames", type=int, default=20000)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    # An empty path skips any parameters.json so the defaults are measured
+    output_ids = ParameterConfigs(params_file="").output_ids
+    rng = np.random.default_rng(args.seed)
+    frames = rng.uniform(-1.0, 1.0, (args.frames, len(output_ids))).tolist()
+    serializer = InjectParameterSerializer(output_ids)
+
+    assert serializer.serialize("check", frames[0]) == json_request(
+        "check", output_ids, frames[0]
+    )
+
+    paths = {
+        "json.dumps": lambda request_id, values: json_request(
+            request_id, output_ids, values
+        ),
+        "precompiled": serializer.serialize,
+    }
+    print(f"frames: {args.frames}, outputs: {len(output_ids)}")
+    print(f"{'path':<14}{'us/frame':>10}{'bytes/frame':>13}{'MB/s':>10}")
+    for name, serialize in paths.items():
+        us_per_frame, bytes_per_frame, bytes_per_sec = time_path(
+            serialize, frames
+        )
+        print(
+            f"{name:<14}{us_per_frame:>10.2f}{bytes_per_frame:>13.0f}"
+            f"{bytes_per_sec / 1e6:>10.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,172 @@
+import numpy as np
+from scipy.spatial.transform import Rotation
+from computation.blendshape_names import BLENDSHAPE_NAMES
+from computation.landmark_parser import NUM_LANDMARKS
+from computation.landmark_sets import (
+    LEFT_EYE_CONTOUR,
+    RIGHT_EYE_CONTOUR,
+    LIP_CONTOUR,
+    FACE_OVAL_CONTOUR,
+    LEFT_EYEBROW_CONTOUR,
+    RIGHT_EYEBROW_CONTOUR,
+)
+
+# Inner lip contour, ordered like LIP_CONTOUR
+INNER_LIP_CONTOUR = (
+    78,
+    95,
+    88,
+    178,
+    87,
+    14,
+    317,
+    402,
+    318,
+    324,
+    308,
+    415,
+    310,
+    311,
+    312,
+    13,
+    82,
+    81,
+    80,
+    191,
+)
+
+
+def place_ellipse(points, contour, center, radii, depth=0.0):
+    # Contours run along the lower edge first, matching the mediapipe order
+    t = np.linspace(np.pi, -np.pi, len(contour), endpoint=False)
+    rows = np.array(contour)
+    points[rows, 0] = center[0] + radii[0] * np.cos(t)
+    points[rows, 1] = center[1] - radii[1] * np.sin(t)
+    points[rows, 2] = depth * np.cos(t) ** 2
+
+
+def synthetic_landmarks(rng, eye_open=1.0, mouth_open=0.0, noise=0.0005):
+    """Plausible (478, 3) normalized landmarks for a frontal face."""
+    points = np.empty((NUM_LANDMARKS, 3))
+    center = 0.5 + rng.normal(0.0, 0.01, 2)
+
+    # Unlabelled landmarks are scattered over the face
+    angle = rng.uniform(0.0, 2 * np.pi, NUM_LANDMARKS)
+    radius = np.sqrt(rng.uniform(0.0, 0.9, NUM_LANDMARKS))
+    points[:, 0] = center[0] + 0.15 * radius * np.cos(angle)
+    points[:, 1] = center[1] + 0.2 * radius * np.sin(angle)
+    points[:, 2] = 0.05 * radius**2 - 0.03
+
+    place_ellipse(points, FACE_OVAL_CONTOUR, center, (0.15, 0.2), 0.08)
+    eye_height = 0.002 + 0.01 * eye_open
+    place_ellipse(
+        points, LEFT_EYE_CONTOUR, center + (-0.06, -0.05), (0.03, eye_height)
+    )
+    place_ellipse(
+        points, RIGHT_EYE_CONTOUR, center + (0.06, -0.05), (0.03, eye_height)
+    )
+    place_ellipse(
+        points, LEFT_EYEBROW_CONTOUR, center + (-0.06, -0.09), (0.035, 0.008)
+    )
+    place_ellipse(
+        points, RIGHT_EYEBROW_CONTOUR, center + (0.06, -0.09), (0.035, 0.008)
+    )
+    lip_center = center + (0.0, 0.1)
+    place_ellipse(
+        points,
+        LIP_CONTOUR,
+        lip_center,
+        (0.05, 0.02 + 0.03 * mouth_open),
+        0.01,
+    )
+    place_ellipse(
+        points,
+        INNER_LIP_CONTOUR,
+        lip_center,
+        (0.035, 0.002 + 0.028 * mouth_open),
+        0.005,
+    )
+
+    points += rng.normal(0.0, noise, points.shape)
+    return points.astype(np.float32)
+
+
+def synthetic_frames(num_frames, seed=0):
+    rng = np.random.default_rng(seed)
+    return [
+        synthetic_landmarks(
+            rng,
+            eye_open=rng.uniform(0.0, 1.0),
+            mouth_open=rng.uniform(0.0, 1.0),
+        )
+        for _ in range(num_frames)
+    ]
+
+
+class SyntheticLandmark:
+    __slots__ = ("x", "y", "z")
+
+    def __init__(self, x, y, z):
+        self.x = x
+        self.y = y
+        self.z = z
+
+
+class SyntheticCategory:
+    __slots__ = ("index", "score", "category_name")
+
+    def __init__(self, index, score, category_name):
+        self.index = index
+        self.score = score
+        self.category_name = category_name
+
+
+class SyntheticResult:
+    """Shaped like mediapipe's FaceLandmarkerResult for a single face."""
+
+    def __init__(self, landmarks, scores, transformation_matrix):
+        self.face_landmarks = [
+            [SyntheticLandmark(x, y, z) for x, y, z in landmarks.tolist()]
+        ]
+        self.face_blendshapes = [
+            [
+                SyntheticCategory(idx, score, name)
+                for idx, (name, score) in enumerate(
+                    zip(BLENDSHAPE_NAMES, scores.tolist())
+                )
+            ]
+        ]
+        self.facial_transformation_matrixes = [transformation_matrix]
+
+
+def synthetic_blendshapes(rng):
+    # Most blendshapes rest near zero with a few active ones
+    scores = rng.beta(0.5, 6.0, len(BLENDSHAPE_NAMES))
+    active = rng.random(len(BLENDSHAPE_NAMES)) < 0.1
+    scores[active] = rng.uniform(0.3, 1.0, active.sum())
+    return scores
+
+
+def synthetic_pose(rng):
+    matrix = np.eye(4)
+    matrix[:3, :3] = Rotation.from_euler(
+        "zyx", rng.normal(0.0, 10.0, 3), degrees=True
+    ).as_matrix()
+    matrix[:3, 3] = rng.normal((0.0, 0.0, -40.0), (2.0, 2.0, 5.0))
+    return matrix
+
+
+def synthetic_results(num_frames, seed=0):
+    rng = np.random.default_rng(seed)
+    return [
+        SyntheticResult(
+            synthetic_landmarks(
+                rng,
+                eye_open=rng.uniform(0.0, 1.0),
+                mouth_open=rng.uniform(0.0, 1.0),
+            ),
+            synthetic_blendshapes(rng),
+            synthetic_pose(rng),
+        )
+        for _ in range(num_frames)
+    ]
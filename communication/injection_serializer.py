@@ -0,0 +1,47 @@
+import json
+import math
+
+
+class InjectParameterSerializer:
+    """InjectParameterDataRequest JSON with the parameter ids baked in.
+
+    The parameter ids and their order are fixed per config, so the request
+    is compiled once into a format string and each frame only formats the
+    request id and float values into it. Values are formatted like
+    json.dumps formats floats, non-finite values have no JSON form and
+    are sent as 0.0, which leaves the parameter unchanged in add mode.
+    """
+
+    def __init__(self, output_ids: tuple[str, ...]):
+        self.output_ids = output_ids
+        head = json.dumps(
+            {
+                "apiName": "VTubeStudioPublicAPI",
+                "apiVersion": "1.0",
+                "requestID": "",
+                "messageType": "InjectParameterDataRequest",
+                "data": {
+                    "faceFound": True,
+                    "mode": "add",
+                    "parameterValues": [],
+                },
+            }
+        )
+        head = head.replace("%", "%%")
+        head = head.replace('"requestID": ""', '"requestID": "%s"')
+        values = ", ".join(
+            '{"id": %s, "value": %%s}'
+            % json.dumps(output_id).replace("%", "%%")
+            for output_id in output_ids
+        )
+        self.template = head.replace(
+            '"parameterValues": []', f'"parameterValues": [{values}]'
+        )
+
+    def serialize(self, request_id: str, values: list[float]) -> str:
+        values = [float(value) for value in values]
+        if not all(map(math.isfinite, values)):
+            values = [
+                value if math.isfinite(value) else 0.0 for value in values
+            ]
+        return self.template % (request_id, *map(float.__repr__, values))
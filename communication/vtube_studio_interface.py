@@ -1,10 +1,26 @@
 import json
 import os
+import time
+from threading import Condition, Thread
 from websockets.sync.client import connect
+from websockets.exceptions import ConnectionClosed
+from communication.injection_serializer import InjectParameterSerializer
+from diagnostics.latency_tracer import LatencyTracer
+from computation.output_predictor import OutputPredictor
+
+REQUEST_ID = "lilacs-vts-face-tracker"
 
 
 class VTSInterface:
-    def __init__(self, address: str, auth_file: str):
+    def __init__(
+        self,
+        address: str,
+        auth_file: str,
+        max_in_flight: int = 4,
+        response_timeout_sec: float = 1.0,
+        tracer: LatencyTracer | None = None,
+        predictor: OutputPredictor | None = None,
+    ):
         self.websocket = connect(address)
         if auth_file == "":
             raise Exception("Authentication filepath cannot be empty!")
@@ -22,13 +38,60 @@ class VTSInterface:
 
         self.authenticate()
 
+        # Injection is pipelined: the sender only ever holds the newest
+        # parameter frame and the receiver matches responses by requestID
+        self.condition = Condition()
+        self.latest_values = None
+        self.in_flight = {}
+        self.max_in_flight = max_in_flight
+        self.response_timeout_ns = int(response_timeout_sec * 1e9)
+        self.request_count = 0
+        self.sent = 0
+        self.coalesced = 0
+        self.responses = 0
+        self.unmatched = 0
+        self.timed_out = 0
+        self.api_errors = 0
+        self.last_round_trip_ms = 0.0
+        self.serializer = None
+        self.tracer = tracer
+        # Extrapolates each frame to the time it is sent
+        self.predictor = predictor
+        self.error = None
+        self.running = True
+        self.sender_thread = Thread(target=self._send_loop, daemon=True)
+        self.receiver_thread = Thread(target=self._receive_loop, daemon=True)
+        self.sender_thread.start()
+        self.receiver_thread.start()
+
     def close(self):
+        running_threads = getattr(self, "running", False)
+        if running_threads:
+            with self.condition:
+                self.running = False
+                self.condition.notify_all()
         if self.websocket:
             self.websocket.close()
+        if running_threads:
+            self.sender_thread.join()
+            self.receiver_thread.join()
 
     def __del__(self):
-        if self.websocket:
-            self.websocket.close()
+        self.close()
+
+    @property
+    def stats(self):
+        with self.condition:
+            return {
+                "sent": self.sent,
+                "coalesced": self.coalesced,
+                "responses": self.responses,
+                "in_flight": len(self.in_flight),
+                "unmatched": self.unmatched,
+                "timed_out": self.timed_out,
+                "api_errors": self.api_errors,
+                "last_round_trip_ms": self.last_round_trip_ms,
+            }
 
     # Request authentication
     def get_authentication_token(self):
@@ -113,22 +176,100 @@ class VTSInterface:
         websocket.send(request_message_json)
         _ = websocket.recv()
 
+    def injection_request(self, request_id, parameter_outputs):
+        # Recompile the request template only when the output ids change
+        if (
+            self.serializer is None
+            or self.serializer.output_ids is not parameter_outputs.output_ids
+        ):
+            self.serializer = InjectParameterSerializer(
+                parameter_outputs.output_ids
+            )
+        return self.serializer.serialize(request_id, parameter_outputs.values)
+
     def send_detection_parameter_results(self, detection_param_values):
-        face_found = len(detection_param_values) > 0
-        request = {
-            "apiName": "VTubeStudioPublicAPI",
-            "apiVersion": "1.0",
-            "requestID": "lilacs-vts-face-tracker",
-            "messageType": "InjectParameterDataRequest",
-            "data": {
-                "faceFound": face_found,
-                "mode": "add",
-                "parameterValues": detection_param_values,
-            },
-        }
+        # Surface connection errors from the sender threads to the caller
+        if self.error is not None:
+            raise self.error
 
         # only write if there are parameters to set
-        if len(request["data"]["parameterValues"]) > 0:
-            request_json = json.dumps(request)
-            self.websocket.send(request_json)
-            _ = self.websocket.recv(decode=False)
+        if len(detection_param_values) > 0:
+            if self.predictor is not None:
+                self.predictor.observe(detection_param_values)
+            with self.condition:
+                if self.latest_values is not None:
+                    self.coalesced += 1
+                self.latest_values = detection_param_values
+                self.condition.notify_all()
+
+    def _expire_in_flight(self, now_ns):
+        expired = [
+            request_id
+            for request_id, sent_ns in self.in_flight.items()
+            if now_ns - sent_ns > self.response_timeout_ns
+        ]
+        for request_id in expired:
+            del self.in_flight[request_id]
+        self.timed_out += len(expired)
+
+    def _send_loop(self):
+        while True:
+            with self.condition:
+                while self.running and (
+                    self.latest_values is None
+                    or len(self.in_flight) >= self.max_in_flight
+                ):
+                    self.condition.wait(self.response_timeout_ns / 1e9)
+                    self._expire_in_flight(time.monotonic_ns())
+                if not self.running:
+                    return
+                detection_param_values = self.latest_values
+                self.latest_values = None
+                self.request_count += 1
+                request_id = f"{REQUEST_ID}-{self.request_count}"
+                self.in_flight[request_id] = time.monotonic_ns()
+
+            try:
+                if self.predictor is not None:
+                    detection_param_values = self.predictor.predict(
+                        detection_param_values, time.monotonic_ns()
+                    )
+                request_json = self.injection_request(
+                    request_id, detection_param_values
+                )
+                self.websocket.send(request_json)
+            except Exception as e:
+                # Raised to the caller by send_detection_parameter_results
+                self._fail(e)
+                return
+            if self.tracer is not None:
+                self.tracer.mark(detection_param_values.timestamp, "sent")
+            with self.condition:
+                self.sent += 1
+
+    def _receive_loop(self):
+        while self.running:
+            try:
+                response_json = self.websocket.recv()
+            except ConnectionClosed as e:
+                self._fail(e)
+                return
+            response = json.loads(response_json)
+            received_ns = time.monotonic_ns()
+            with self.condition:
+                sent_ns = self.in_flight.pop(response.get("requestID"), None)
+                if sent_ns is None:
+                    self.unmatched += 1
+                else:
+                    self.responses += 1
+                    self.last_round_trip_ms = (received_ns - sent_ns) / 1e6
+                if response.get("messageType") == "APIError":
+                    self.api_errors += 1
+                self.condition.notify_all()
+
+    def _fail(self, error):
+        with self.condition:
+            if self.running and self.error is None:
+                self.error = error
+            self.running = False
+            self.condition.notify_all()
@@ -0,0 +1,60 @@
+import numpy as np
+from computation.blendshape_names import BLENDSHAPE_NAMES, BLENDSHAPE_INDICES
+from computation.parameters import BlendshapeParameter
+
+
+class BlendshapePlan:
+    """All blendshape parameters compiled into masks over the score vector.
+
+    Row i of the sign masks selects the 'Max Positive' (first half) and
+    'Max Negative' (second half) inputs of parameter i, so every parameter
+    is evaluated with one masked max, subtract, scale, offset and clamp.
+    """
+
+    def __init__(self, parameters: list[BlendshapeParameter], revision=0):
+        self.revision = revision
+        self.output_ids = tuple(
+            parameter.output_id for parameter in parameters
+        )
+        num_parameters = len(parameters)
+        num_blendshapes = len(BLENDSHAPE_NAMES)
+
+        # Scores are in [0, 1], so multiplying by a 0/1 mask and taking the
+        # max matches the running max from 0 the per-parameter loop used
+        self.sign_masks = np.zeros(
+            (2 * num_parameters, num_blendshapes), dtype=np.float64
+        )
+        self.scale = np.empty(num_parameters, dtype=np.float64)
+        self.offset = np.empty(num_parameters, dtype=np.float64)
+        self.lower = np.full(num_parameters, -np.inf, dtype=np.float64)
+        self.upper = np.full(num_parameters, np.inf, dtype=np.float64)
+        for idx, parameter in enumerate(parameters):
+            for input_parameter in parameter.input_parameters:
+                blendshape_idx = BLENDSHAPE_INDICES[input_parameter.name]
+                if input_parameter.sign == 1:
+                    self.sign_masks[idx, blendshape_idx] = 1.0
+                elif input_parameter.sign == -1:
+                    self.sign_masks[num_parameters + idx, blendshape_idx] = 1.0
+            self.scale[idx] = parameter.scale
+            self.offset[idx] = parameter.offset
+            if parameter.clamp:
+                self.lower[idx] = parameter.min_val
+                self.upper[idx] = parameter.max_val
+
+        self.masked = np.empty_like(self.sign_masks)
+        self.signed_max = np.empty(2 * num_parameters, dtype=np.float64)
+        self.values = np.empty(num_parameters, dtype=np.float64)
+
+    def compute(self, scores: np.ndarray):
+        num_parameters = len(self.values)
+        np.multiply(self.sign_masks, scores, out=self.masked)
+        np.max(self.masked, axis=1, out=self.signed_max, initial=0.0)
+        np.subtract(
+            self.signed_max[:num_parameters],
+            self.signed_max[num_parameters:],
+            out=self.values,
+        )
+        self.values -= self.offset
+        self.values *= self.scale
+        np.clip(self.values, self.lower, self.upper, out=self.values)
+        return self.values
@@ -1,14 +1,52 @@
 from computation.parameter_config import ParameterConfigs, ParameterType
 from computation.landmark_parser import LandmarkParser
+from computation.geometry_cache import GeometryCache
+from computation.output_filter import OutputFilter
 from scipy.spatial.transform import Rotation
-from threading import Lock
-from copy import deepcopy
+import numpy as np
+
+
+class ParameterOutputs:
+    """Output values in the order of their (shared, per config) id tuple."""
+
+    def __init__(
+        self,
+        output_ids: tuple[str, ...],
+        values: list[float],
+        timestamp: int | None = None,
+    ):
+        self.output_ids = output_ids
+        self.values = values
+        # Timestamp of the frame the values were computed from
+        self.timestamp = timestamp
+
+    def __len__(self):
+        return len(self.values)
+
+    def __iter__(self):
+        for output_id, value in zip(self.output_ids, self.values):
+            yield {"id": output_id, "value": value}
+
+    def as_dicts(self):
+        return list(self)
 
 
 class ParameterComputerResults:
+    """Read-only snapshot of one frame, shared with the GUI without copies.
+
+    Every frame gets fresh arrays, so the snapshot only marks them
+    read-only instead of copying them. A snapshot is never modified after
+    it is published.
+    """
+
     def __init__(self, outputs, landmarks, blendshapes, timestamp):
-        self.outputs = outputs
+        # The values list is handed on to VTS, keep a frozen copy
+        self.outputs = ParameterOutputs(
+            outputs.output_ids, tuple(outputs.values), outputs.timestamp
+        )
+        landmarks.points.setflags(write=False)
         self.landmarks = landmarks
+        blendshapes.setflags(write=False)
         self.blendshapes = blendshapes
         self.timestamp = timestamp
 
@@ -18,94 +56,119 @@ class ParameterComputerResults:
 
 
 class ParameterComputer:
-    def __init__(self, save_results: bool = False):
-        self.parameter_configs = ParameterConfigs()
+    def __init__(
+        self, save_results: bool = False, params_file="parameters.json"
+    ):
+        self.parameter_configs = ParameterConfigs(params_file)
         self.save_results = save_results
+        # Latest ParameterComputerResults, replaced rather than updated
         self.results = None
-        self.lock = Lock()
-
-    def get_parameter(self, id, value):
-        return [{"id": id, "value": value}]
+        # Called after new results are published, e.g. to wake the GUI
+        self.on_results = None
+        # Optional computation.result_history.ResultHistory for plots
+        self.history = None
+        self.geometry_cache = GeometryCache()
+        self.output_filter = OutputFilter()
+        # Optional recording.session_store.SessionRecorder
+        self.session_recorder = None
 
     def compute_translation_rotation(self, transformation_matrix):
-        output = []
-
+        # Values are ordered like FACE_POSE_OUTPUT_IDS
         pos_of = self.parameter_configs.face_position_offset
         rot_of = self.parameter_configs.face_rotation_offset
 
         translation_vector = transformation_matrix[:3, 3]
-        output += self.get_parameter(
-            "FacePositionX", float(-translation_vector[0] - pos_of[0])
-        )
-        output += self.get_parameter(
-            "FacePositionY", float(translation_vector[1] - pos_of[1])
-        )
-        output += self.get_parameter(
-            "FacePositionZ", float(-translation_vector[2] - pos_of[2])
-        )
-
         rotation_matrix = transformation_matrix[:3, :3]
         r = Rotation.from_matrix(rotation_matrix)
         angles = r.as_euler("zyx", degrees=True)
-        output += self.get_parameter(
-            "FaceAngleX", float(-angles[1]) - rot_of[0]
+        return [
+            float(-translation_vector[0] - pos_of[0]),
+            float(translation_vector[1] - pos_of[1]),
+            float(-translation_vector[2] - pos_of[2]),
+            float(-angles[1]) - rot_of[0],
+            float(-angles[2]) - rot_of[1],
+            float(angles[0] - rot_of[2]),
+        ]
+
+    def create_blendshapes_vector(self, blendshape_list):
+        # Replayed recordings already hold the scores as an array
+        if isinstance(blendshape_list, np.ndarray):
+            return blendshape_list.astype(np.float64, copy=False)
+        # Categories arrive in BLENDSHAPE_NAMES order
+        return np.fromiter(
+            (shape.score for shape in blendshape_list),
+            dtype=np.float64,
+            count=len(blendshape_list),
         )
-        output += self.get_parameter(
-            "FaceAngleY", float(-angles[2]) - rot_of[1]
-        )
-        output += self.get_parameter(
-            "FaceAngleZ", float(angles[0] - rot_of[2])
-        )
-        return output
 
-    def create_blendshapes_dict(self, blendshape_list):
-        shapes = {}
-        for shape in blendshape_list:
-            shapes[shape.category_name] = shape.score
-        return shapes
-
-    def compute_parameters(self, detection_result, timestamp):
+    def compute_parameters(self, detection_result, timestamp, face_idx=0):
         face_blendshapes_list = detection_result.face_blendshapes
-        if len(face_blendshapes_list) == 0:
+        if len(face_blendshapes_list) <= face_idx:
             # Do nothing if no shapes found
-            return []
+            return ParameterOutputs((), [], timestamp)
+        configs = self.parameter_configs
+        parameters, output_ids, blendshape_plan = configs.snapshot()
 
-        face_blendshapes = self.create_blendshapes_dict(
-            face_blendshapes_list[0]
+        face_blendshapes = self.create_blendshapes_vector(
+            face_blendshapes_list[face_idx]
         )
 
-        face_landmarks = detection_result.face_landmarks[0]
+        face_landmarks = detection_result.face_landmarks[face_idx]
         landmark_parser = LandmarkParser(face_landmarks)
         landmark_sets = landmark_parser.get_landmark_sets()
+        self.geometry_cache.new_frame(landmark_sets)
 
         transformation_matrix = (
-            detection_result.facial_transformation_matrixes[0]
+            detection_result.facial_transformation_matrixes[face_idx]
         )
 
         # Compute Parameters from results
-        output = []
-        for parameter in self.parameter_configs.parameters:
+        blendshape_values = blendshape_plan.compute(face_blendshapes).tolist()
+        blendshape_idx = 0
+        values = []
+        for parameter in parameters:
             match parameter.parameter_type:
                 case ParameterType.BLENDSHAPE:
-                    output += parameter.parameter.compute_value(
-                        face_blendshapes
-                    )
+                    values.append(blendshape_values[blendshape_idx])
+                    blendshape_idx += 1
                 case ParameterType.LANDMARK:
-                    output += parameter.parameter.compute_value(landmark_sets)
+                    parameter.parameter.calculate(
+                        landmark_sets,
+                        self.geometry_cache,
+                        configs.geometry_backend,
+                    )
+                    values.append(float(parameter.parameter.output_value()))
 
-        output += self.compute_translation_rotation(transformation_matrix)
+        values += self.compute_translation_rotation(transformation_matrix)
+        values = self.output_filter.apply(configs, values, timestamp)
+        output = ParameterOutputs(output_ids, values, timestamp)
+
+        if self.session_recorder is not None:
+            self.session_recorder.write(
+                timestamp,
+                landmark_sets.points,
+                face_blendshapes,
+                transformation_matrix,
+                output,
+            )
 
         if self.save_results:
-            with self.lock:
-                self.results = ParameterComputerResults(
-                    output, landmark_sets, face_blendshapes, timestamp
-                )
+            self.store_results(
+                output, landmark_sets, face_blendshapes, timestamp
+            )
 
         return output
 
+    def store_results(self, output, landmark_sets, blendshapes, timestamp):
+        if self.history is not None:
+            self.history.append(output, blendshapes, timestamp)
+        # Publishing is a single reference swap, readers keep whichever
+        # snapshot they already hold
+        self.results = ParameterComputerResults(
+            output, landmark_sets, blendshapes, timestamp
+        )
+        if self.on_results is not None:
+            self.on_results()
+
     def get_results(self):
-        if self.results is not None:
-            with self.lock:
-                return deepcopy(self.results)
-        else:
-            return None
+        return self.results
@@ -0,0 +1,89 @@
+from threading import Condition, Thread
+
+
+class ComputeWorker:
+    """Runs the parameter pipeline on its own thread.
+
+    submit() only drops the result into a single slot, so mediapipe's
+    result thread never waits on parameter computation or the VTS
+    socket. If the worker is still busy when the next result arrives,
+    the older waiting result is replaced and counted as dropped.
+
+    One thread, not a pool: ParameterComputer keeps per-frame state
+    (geometry cache, results), and frames have to reach VTS in order.
+    """
+
+    def __init__(self, handler):
+        self.handler = handler
+        self.condition = Condition()
+        self.pending = None
+        self.submitted = 0
+        self.dropped = 0
+        self.completed = 0
+        self.error = None
+        self.running = False
+        self.thread = None
+
+    def start(self):
+        if self.thread is not None:
+            return
+        self.running = True
+        self.thread = Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        if self.thread is None:
+            return
+        with self.condition:
+            self.running = False
+            self.condition.notify_all()
+        self.thread.join()
+        self.thread = None
+
+    def check(self):
+        if self.error is not None:
+            raise self.error
+
+    @property
+    def depth(self):
+        with self.condition:
+            return 0 if self.pending is None else 1
+
+    @property
+    def stats(self):
+        with self.condition:
+            return {
+                "submitted": self.submitted,
+                "completed": self.completed,
+                "dropped": self.dropped,
+                "depth": 0 if self.pending is None else 1,
+            }
+
+    def submit(self, detection_result, timestamp):
+        with self.condition:
+            if self.pending is not None:
+                self.dropped += 1
+            self.pending = (detection_result, timestamp)
+            self.submitted += 1
+            self.condition.notify_all()
+
+    def _run(self):
+        while True:
+            with self.condition:
+                self.condition.wait_for(
+                    lambda: self.pending is not None or not self.running
+                )
+                if not self.running:
+                    return
+                detection_result, timestamp = self.pending
+                self.pending = None
+            try:
+                self.handler(detection_result, timestamp)
+            except Exception as e:
+                # Raised to the detection loop by check()
+                with self.condition:
+                    self.error = e
+                    self.running = False
+                return
+            with self.condition:
+                self.completed += 1
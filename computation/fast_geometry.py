@@ -0,0 +1,166 @@
+"""Closed form geometry used by the fast landmark geometry backend.
+
+Ellipse fit: the same Halir & Flusser direct least squares conic fit that
+skimage's EllipseModel uses, reduced to the axis ratio. The ratio only
+depends on the quadratic part of the conic, so the 3x3 eigenproblem is
+solved in closed form and the center and angle are never computed.
+Matches EllipseModel to within 1e-6 (relative).
+
+Polygon area: shoelace area of an ordered contour (2D), or the magnitude
+of the Newell vector area for 3D contours. This is the area enclosed by
+the set's outer boundary, not the surface area of the convex hull Qhull
+reports, so the lips / face oval ratio tracks the reference value but
+differs by up to ~10% of it. Retune HULL_CALCULATION offsets and scales
+when switching backends.
+
+See benchmarks/bench_geometry.py for timings and measured deviations.
+"""
+
+import math
+import numpy as np
+
+
+def _solve_3x3(m, rhs):
+    # Cramer's rule for m @ x = rhs where rhs holds three column vectors
+    (a, b, c), (d, e, f), (g, h, i) = m
+    co_a = e * i - f * h
+    co_b = f * g - d * i
+    co_c = d * h - e * g
+    det = a * co_a + b * co_b + c * co_c
+    if det == 0.0:
+        raise ValueError("Singular matrix in ellipse fit")
+    inv = (
+        (co_a / det, (c * h - b * i) / det, (b * f - c * e) / det),
+        (co_b / det, (a * i - c * g) / det, (c * d - a * f) / det),
+        (co_c / det, (b * g - a * h) / det, (a * e - b * d) / det),
+    )
+    return [
+        [sum(inv[r][k] * rhs[k][col] for k in range(3)) for col in range(3)]
+        for r in range(3)
+    ]
+
+
+def _real_eigenvalues_3x3(m):
+    # Roots of the characteristic polynomial l^3 + p2 l^2 + p1 l + p0
+    (a, b, c), (d, e, f), (g, h, i) = m
+    p2 = -(a + e + i)
+    p1 = (a * e - b * d) + (a * i - c * g) + (e * i - f * h)
+    p0 = -(a * (e * i - f * h) - b * (d * i - f * g) + c * (d * h - e * g))
+    shift = -p2 / 3.0
+    p = p1 - p2 * p2 / 3.0
+    q = 2.0 * p2**3 / 27.0 - p2 * p1 / 3.0 + p0
+    if p < 0.0:
+        radius = 2.0 * math.sqrt(-p / 3.0)
+        cos_arg = 3.0 * q / (p * radius)
+        theta = math.acos(max(-1.0, min(1.0, cos_arg))) / 3.0
+        return [
+            shift + radius * math.cos(theta - 2.0 * math.pi * k / 3.0)
+            for k in range(3)
+        ]
+    # Single real root (Cardano)
+    root = math.sqrt(q * q / 4.0 + p**3 / 27.0)
+    return [shift + math.cbrt(-q / 2.0 + root) + math.cbrt(-q / 2.0 - root)]
+
+
+def _eigenvector_3x3(m, eig_val):
+    r0 = (m[0][0] - eig_val, m[0][1], m[0][2])
+    r1 = (m[1][0], m[1][1] - eig_val, m[1][2])
+    r2 = (m[2][0], m[2][1], m[2][2] - eig_val)
+    best = None
+    best_norm = -1.0
+    for u, v in ((r0, r1), (r0, r2), (r1, r2)):
+        cross = (
+            u[1] * v[2] - u[2] * v[1],
+            u[2] * v[0] - u[0] * v[2],
+            u[0] * v[1] - u[1] * v[0],
+        )
+        norm = cross[0] ** 2 + cross[1] ** 2 + cross[2] ** 2
+        if norm > best_norm:
+            best, best_norm = cross, norm
+    return best
+
+
+def ellipse_minor_major_ratio(points):
+    xy = np.asarray(points)[:, :2]
+    centered = np.subtract(xy, xy.mean(axis=0), dtype=np.float64)
+    # Normalize to unit standard deviation to keep the fit well conditioned
+    variance = np.vdot(centered, centered) / centered.size
+    if variance <= 0.0:
+        raise ValueError("Cannot fit an ellipse to coincident points")
+    centered /= math.sqrt(variance)
+    x = centered[:, 0]
+    y = centered[:, 1]
+
+    # Rows are the quadratic and linear parts of the design matrix, so one
+    # product gives all three scatter matrices
+    design = np.empty((6, len(x)))
+    np.multiply(x, x, out=design[0])
+    np.multiply(x, y, out=design[1])
+    np.multiply(y, y, out=design[2])
+    design[3] = x
+    design[4] = y
+    design[5] = 1.0
+    s = (design @ design.T).tolist()
+    s1 = [row[:3] for row in s[:3]]
+    s2 = [row[3:] for row in s[:3]]
+    s3 = [row[3:] for row in s[3:]]
+
+    # Reduced scatter matrix M = C1^-1 (S1 - S2 S3^-1 S2^T)
+    s2_t = [list(col) for col in zip(*s2)]
+    t = _solve_3x3(s3, s2_t)
+    reduced = [
+        [
+            s1[r][col] - sum(s2[r][k] * t[k][col] for k in range(3))
+            for col in range(3)
+        ]
+        for r in range(3)
+    ]
+    m = [
+        [0.5 * value for value in reduced[2]],
+        [-value for value in reduced[1]],
+        [0.5 * value for value in reduced[0]],
+    ]
+
+    conic = None
+    for eig_val in _real_eigenvalues_3x3(m):
+        a, b, c = _eigenvector_3x3(m, eig_val)
+        if 4 * a * c - b * b > 0:
+            if conic is not None:
+                raise ValueError("Ellipse fit constraints not met")
+            conic = (a, b, c)
+    if conic is None:
+        raise ValueError("Ellipse fit constraints not met")
+    a, b, c = conic
+
+    # Semi-axes scale with 1 / sqrt(eigenvalue) of [[a, b/2], [b/2, c]]
+    trace = abs(a + c)
+    term = math.sqrt((a - c) ** 2 + b * b)
+    return math.sqrt((trace - term) / (trace + term))
+
+
+def _cross_sum(u, v):
+    # sum over edges of u[i] * v[i + 1] - u[i + 1] * v[i], closing the loop
+    return (
+        np.dot(u[:-1], v[1:])
+        - np.dot(u[1:], v[:-1])
+        + u[-1] * v[0]
+        - u[0] * v[-1]
+    )
+
+
+def polygon_area(points):
+    # Shifting to the first vertex keeps the cross products well conditioned
+    contour = np.asarray(points)
+    relative = np.subtract(contour, contour[0], dtype=np.float64)
+    x = relative[:, 0]
+    y = relative[:, 1]
+    if relative.shape[1] == 2:
+        return 0.5 * abs(float(_cross_sum(x, y)))
+    z = relative[:, 2]
+    return 0.5 * float(
+        np.sqrt(
+            _cross_sum(y, z) ** 2
+            + _cross_sum(z, x) ** 2
+            + _cross_sum(x, y) ** 2
+        )
+    )
@@ -0,0 +1,36 @@
+class GeometryCache:
+    """Frame scoped store for geometry shared between landmark parameters.
+
+    Values are keyed by (landmark set, calculation) so an ellipse fit or hull
+    area is only computed once per frame no matter how many parameters use
+    it. Hit and miss counters accumulate across frames.
+    """
+
+    def __init__(self, landmark_sets=None):
+        self.landmark_sets = landmark_sets
+        self.values = {}
+        self.hits = 0
+        self.misses = 0
+
+    def new_frame(self, landmark_sets):
+        self.landmark_sets = landmark_sets
+        self.values.clear()
+
+    def get(self, landmark_set, calculation, compute):
+        key = (landmark_set, calculation)
+        value = self.values.get(key)
+        if value is None:
+            self.misses += 1
+            value = compute(self.landmark_sets[landmark_set])
+            self.values[key] = value
+        else:
+            self.hits += 1
+        return value
+
+    def reset_counters(self):
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def counters(self):
+        return {"hits": self.hits, "misses": self.misses}
@@ -1,31 +1,86 @@
-from computation.landmark_sets import LANDMARK_SETS
+from collections.abc import Mapping
+import numpy as np
+from computation.landmark_sets import LANDMARK_SETS, LANDMARK_CONTOURS
+
+NUM_LANDMARKS = 478
+XY_COLUMNS = np.array([0, 1], dtype=np.intp)
+XYZ_COLUMNS = np.array([0, 1, 2], dtype=np.intp)
+
+
+def build_set_indexers():
+    # Landmark indices are sorted so every set keeps the ascending landmark
+    # order the per-landmark parser produced
+    indexers = {}
+    for landmark_set_name in LANDMARK_SETS:
+        rows = np.array(
+            sorted(LANDMARK_SETS[landmark_set_name]), dtype=np.intp
+        )
+        indexers[landmark_set_name + "_xy"] = np.ix_(rows, XY_COLUMNS)
+        indexers[landmark_set_name + "_xyz"] = np.ix_(rows, XYZ_COLUMNS)
+    # Contours keep their boundary order for polygon calculations
+    for landmark_set_name in LANDMARK_CONTOURS:
+        rows = np.array(LANDMARK_CONTOURS[landmark_set_name], dtype=np.intp)
+        contour_name = landmark_set_name + "_contour"
+        indexers[contour_name + "_xy"] = np.ix_(rows, XY_COLUMNS)
+        indexers[contour_name + "_xyz"] = np.ix_(rows, XYZ_COLUMNS)
+    return indexers
+
+
+LANDMARK_SET_INDEXERS = build_set_indexers()
+LANDMARK_SET_NAMES = ("all_xy", "all_xyz") + tuple(LANDMARK_SET_INDEXERS)
+
+
+def contour_set_name(landmark_set_name):
+    """Name of the ordered contour for a landmark set, or None."""
+    set_name, _, dims = landmark_set_name.rpartition("_")
+    contour_name = f"{set_name}_contour_{dims}"
+    if contour_name in LANDMARK_SET_INDEXERS:
+        return contour_name
+    return None
+
+
+class LandmarkSets(Mapping):
+    """Named landmark sets backed by a single (N, 3) float32 array.
+
+    Sets are materialized with one precomputed fancy index the first time
+    they are requested and reused for the rest of the frame.
+    """
+
+    def __init__(self, points: np.ndarray):
+        self.points = points
+        self.cache = {
+            "all_xy": points[:, :2],
+            "all_xyz": points,
+        }
+
+    def __getitem__(self, name):
+        landmark_set = self.cache.get(name)
+        if landmark_set is None:
+            landmark_set = self.points[LANDMARK_SET_INDEXERS[name]]
+            self.cache[name] = landmark_set
+        return landmark_set
+
+    def __iter__(self):
+        return iter(LANDMARK_SET_NAMES)
+
+    def __len__(self):
+        return len(LANDMARK_SET_NAMES)
 
 
 class LandmarkParser:
     def __init__(self, landmarks):
-        self.landmark_sets = {}
-        self.landmark_sets["all_xy"] = []
-        self.landmark_sets["all_xyz"] = []
-        for landmark_set_name in LANDMARK_SETS:
-            self.landmark_sets[landmark_set_name + "_xy"] = []
-            self.landmark_sets[landmark_set_name + "_xyz"] = []
-        self.read_landmarks(landmarks)
+        self.landmark_sets = LandmarkSets(self.read_landmarks(landmarks))
 
     def read_landmarks(self, landmarks):
-        for idx in range(len(landmarks)):
-            landmark = landmarks[idx]
-            for landmark_set_name in LANDMARK_SETS:
-                if idx in LANDMARK_SETS[landmark_set_name]:
-                    self.landmark_sets[landmark_set_name + "_xy"].append(
-                        (landmark.x, landmark.y)
-                    )
-                    self.landmark_sets[landmark_set_name + "_xyz"].append(
-                        [landmark.x, landmark.y, landmark.z]
-                    )
-                self.landmark_sets["all_xy"].append((landmark.x, landmark.y))
-                self.landmark_sets["all_xyz"].append(
-                    [landmark.x, landmark.y, landmark.z]
-                )
+        if isinstance(landmarks, np.ndarray):
+            return np.asarray(landmarks, dtype=np.float32)
+        points = np.empty((len(landmarks), 3), dtype=np.float32)
+        points.ravel()[:] = [
+            value
+            for landmark in landmarks
+            for value in (landmark.x, landmark.y, landmark.z)
+        ]
+        return points
 
     def get_landmark_sets(self):
         return self.landmark_sets
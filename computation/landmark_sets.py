@@ -151,3 +151,139 @@ LANDMARK_SETS = {
     "left_eyebrow": LEFT_EYEBROW_LANDMARK_SET,
     "right_eyebrow": RIGHT_EYEBROW_LANDMARK_SET,
 }
+
+# Outer boundary of each set, ordered around the contour
+LEFT_EYE_CONTOUR = (
+    33,
+    7,
+    163,
+    144,
+    145,
+    153,
+    154,
+    155,
+    133,
+    173,
+    157,
+    158,
+    159,
+    160,
+    161,
+    246,
+)
+
+RIGHT_EYE_CONTOUR = (
+    263,
+    249,
+    390,
+    373,
+    374,
+    380,
+    381,
+    382,
+    362,
+    398,
+    384,
+    385,
+    386,
+    387,
+    388,
+    466,
+)
+
+LIP_CONTOUR = (
+    61,
+    146,
+    91,
+    181,
+    84,
+    17,
+    314,
+    405,
+    321,
+    375,
+    291,
+    409,
+    270,
+    269,
+    267,
+    0,
+    37,
+    39,
+    40,
+    185,
+)
+
+FACE_OVAL_CONTOUR = (
+    10,
+    338,
+    297,
+    332,
+    284,
+    251,
+    389,
+    356,
+    454,
+    323,
+    361,
+    288,
+    397,
+    365,
+    379,
+    378,
+    400,
+    377,
+    152,
+    148,
+    176,
+    149,
+    150,
+    136,
+    172,
+    58,
+    132,
+    93,
+    234,
+    127,
+    162,
+    21,
+    54,
+    103,
+    67,
+    109,
+)
+
+LEFT_EYEBROW_CONTOUR = (
+    46,
+    53,
+    52,
+    65,
+    55,
+    107,
+    66,
+    105,
+    63,
+    70,
+)
+
+RIGHT_EYEBROW_CONTOUR = (
+    276,
+    283,
+    282,
+    295,
+    285,
+    336,
+    296,
+    334,
+    293,
+    300,
+)
+
+LANDMARK_CONTOURS = {
+    "left_eye": LEFT_EYE_CONTOUR,
+    "right_eye": RIGHT_EYE_CONTOUR,
+    "lips": LIP_CONTOUR,
+    "face_oval": FACE_OVAL_CONTOUR,
+    "left_eyebrow": LEFT_EYEBROW_CONTOUR,
+    "right_eyebrow": RIGHT_EYEBROW_CONTOUR,
+}
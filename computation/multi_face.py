@@ -0,0 +1,180 @@
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+from computation.compute_parameters import ParameterComputer
+from computation.landmark_sets import FACE_OVAL_CONTOUR
+
+# Largest centroid movement between frames, in normalized image units,
+# for a detection to keep its identity
+MAX_CENTROID_DISTANCE = 0.2
+# Frames a face may go undetected before its identity is freed
+MAX_MISSING_FRAMES = 30
+FACE_OVAL_ROWS = np.array(FACE_OVAL_CONTOUR)
+
+
+def face_centroid(landmarks):
+    # Center of the face oval bounding box
+    if isinstance(landmarks, np.ndarray):
+        oval = landmarks[FACE_OVAL_ROWS, :2]
+        xs = oval[:, 0]
+        ys = oval[:, 1]
+    else:
+        xs = [landmarks[idx].x for idx in FACE_OVAL_CONTOUR]
+        ys = [landmarks[idx].y for idx in FACE_OVAL_CONTOUR]
+    return (
+        (float(min(xs)) + float(max(xs))) / 2,
+        (float(min(ys)) + float(max(ys))) / 2,
+    )
+
+
+class FaceTracker:
+    """Assigns detections to stable face ids by nearest centroid.
+
+    Ids are slots 0..num_faces-1. A detection keeps the id of the closest
+    face from the previous frames, new faces take the lowest free id.
+    """
+
+    def __init__(
+        self,
+        num_faces: int,
+        max_distance: float = MAX_CENTROID_DISTANCE,
+        max_missing: int = MAX_MISSING_FRAMES,
+    ):
+        self.max_distance = max_distance
+        self.max_missing = max_missing
+        # (centroid, frames missing) per id, None while free
+        self.tracks = [None] * num_faces
+
+    def assign(self, centroids):
+        """Face id per centroid, None if every id is taken."""
+        pairs = []
+        for detection_idx, (x, y) in enumerate(centroids):
+            for face_id, track in enumerate(self.tracks):
+                if track is None:
+                    continue
+                (track_x, track_y), _ = track
+                distance = ((x - track_x) ** 2 + (y - track_y) ** 2) ** 0.5
+                if distance <= self.max_distance:
+                    pairs.append((distance, detection_idx, face_id))
+        pairs.sort()
+
+        face_ids = [None] * len(centroids)
+        matched = set()
+        for _, detection_idx, face_id in pairs:
+            if face_ids[detection_idx] is None and face_id not in matched:
+                face_ids[detection_idx] = face_id
+                matched.add(face_id)
+
+        # Unmatched tracks age, the rest are updated below
+        for face_id, track in enumerate(self.tracks):
+            if track is not None and face_id not in matched:
+                centroid, missing = track
+                if missing + 1 > self.max_missing:
+                    self.tracks[face_id] = None
+                else:
+                    self.tracks[face_id] = (centroid, missing + 1)
+
+        for detection_idx, centroid in enumerate(centroids):
+            if face_ids[detection_idx] is None:
+                face_ids[detection_idx] = self.free_id(matched)
+            if face_ids[detection_idx] is not None:
+                matched.add(face_ids[detection_idx])
+                self.tracks[face_ids[detection_idx]] = (centroid, 0)
+        return face_ids
+
+    def free_id(self, matched):
+        for face_id, track in enumerate(self.tracks):
+            if track is None and face_id not in matched:
+                return face_id
+        return None
+
+
+class MultiFaceComputer:
+    """One ParameterComputer per tracked face id.
+
+    Faces are computed on a thread pool, which overlaps the parts of the
+    computation that release the GIL (NumPy, SciPy, scikit-image).
+
+    Every face has its own ParameterConfigs, loaded from its entry in
+    params_files or the last entry. They can't be shared: landmark
+    parameters keep their value from calculate() to output_value(), which
+    would race between faces computed in parallel. Edits to one face's
+    configs, e.g. in the GUI, do not reach the others.
+    """
+
+    def __init__(
+        self,
+        num_faces: int,
+        save_results: bool = False,
+        params_files=("parameters.json",),
+    ):
+        self.tracker = FaceTracker(num_faces)
+        self.computers = [
+            ParameterComputer(
+                save_results=save_results,
+                params_file=params_files[min(face_id, len(params_files) - 1)],
+            )
+            for face_id in range(num_faces)
+        ]
+        # Detection index of each face id in the latest result
+        self.face_indices = {}
+        self.executor = None
+        if num_faces > 1:
+            self.executor = ThreadPoolExecutor(
+                max_workers=num_faces, thread_name_prefix="face"
+            )
+
+    def compute_parameters(self, detection_result, timestamp):
+        """Parameter outputs for each face found, as (face_id, outputs)."""
+        if len(self.computers) == 1:
+            # A single face needs no identity, the first detection is face 0
+            face_ids = [0] + [None] * (
+                len(detection_result.face_landmarks) - 1
+            )
+        else:
+            centroids = [
+                face_centroid(landmarks)
+                for landmarks in detection_result.face_landmarks
+            ]
+            face_ids = self.tracker.assign(centroids)
+        tasks = [
+            (face_id, face_idx)
+            for face_idx, face_id in enumerate(face_ids)
+            if face_id is not None
+        ]
+        self.face_indices = dict(tasks)
+        if self.executor is None or len(tasks) < 2:
+            return [
+                (
+                    face_id,
+                    self.computers[face_id].compute_parameters(
+                        detection_result, timestamp, face_idx
+                    ),
+                )
+                for face_id, face_idx in tasks
+            ]
+        futures = [
+            (
+                face_id,
+                self.executor.submit(
+                    self.computers[face_id].compute_parameters,
+                    detection_result,
+                    timestamp,
+                    face_idx,
+                ),
+            )
+            for face_id, face_idx in tasks
+        ]
+        return [(face_id, future.result()) for face_id, future in futures]
+
+    @property
+    def parameter_configs(self):
+        # Ordered by face id
+        return [computer.parameter_configs for computer in self.computers]
+
+    def face_index(self, face_id):
+        """Detection index of face_id in the latest result, or None."""
+        return self.face_indices.get(face_id)
+
+    def close(self):
+        if self.executor is not None:
+            self.executor.shutdown()
@@ -0,0 +1,270 @@
+from enum import Enum
+import numpy as np
+
+# Floor for the time between frames, repeated timestamps must not divide
+# by zero
+MIN_DT_SEC = 1e-3
+# Lowest cutoff frequency, a cutoff of 0 would freeze the output
+MIN_CUTOFF_HZ = 1e-3
+# Lowest Kalman measurement noise, with no process noise either the gain
+# would be 0 / 0
+MIN_MEASUREMENT_NOISE = 1e-6
+# Settings that restart an output's filter when they change, after the
+# filter type
+SETTING_FIELDS = (
+    "min_cutoff",
+    "beta",
+    "d_cutoff",
+    "process_noise",
+    "measurement_noise",
+)
+# Velocity variance a Kalman filter starts with, the first frames then
+# settle it from the measurements
+INITIAL_VELOCITY_VARIANCE = 1.0
+
+
+class FilterType(Enum):
+    NONE = 0
+    # Speed adaptive low pass filter, Casiez et al. 2012
+    ONE_EURO = 1
+    # Constant velocity model with white noise acceleration
+    KALMAN = 2
+
+
+class FilterOptions:
+    """Smoothing settings of one output.
+
+    min_cutoff, beta and d_cutoff are One Euro settings, process_noise
+    and measurement_noise are Kalman settings.
+    """
+
+    # Fields compiled into OutputFilter
+    TUNABLE_FIELDS = (
+        "filter_type",
+        "min_cutoff",
+        "beta",
+        "d_cutoff",
+        "process_noise",
+        "measurement_noise",
+    )
+
+    def __init__(
+        self,
+        filter_type: FilterType = FilterType.NONE,
+        min_cutoff: float = 1.0,
+        beta: float = 1.0,
+        d_cutoff: float = 1.0,
+        process_noise: float = 10.0,
+        measurement_noise: float = 1e-3,
+    ):
+        self.on_change = None
+        if type(filter_type) is str:
+            filter_type = FilterType[filter_type]
+        elif type(filter_type) is int:
+            filter_type = FilterType(filter_type)
+        self.filter_type = filter_type
+        self.min_cutoff = min_cutoff
+        self.beta = beta
+        self.d_cutoff = d_cutoff
+        self.process_noise = process_noise
+        self.measurement_noise = measurement_noise
+
+    def __setattr__(self, name, value):
+        if (
+            name in FilterOptions.TUNABLE_FIELDS
+            and self.on_change is not None
+            and getattr(self, name) != value
+        ):
+            super().__setattr__(name, value)
+            self.on_change()
+            return
+        super().__setattr__(name, value)
+
+    @classmethod
+    def from_value(cls, value):
+        # Configs hold options, parameters.json holds dicts
+        if value is None:
+            return cls()
+        if type(value) is dict:
+            return cls(**value)
+        return value
+
+    def serialize(self):
+        return {
+            "filter_type": self.filter_type.name,
+            "min_cutoff": self.min_cutoff,
+            "beta": self.beta,
+            "d_cutoff": self.d_cutoff,
+            "process_noise": self.process_noise,
+            "measurement_noise": self.measurement_noise,
+        }
+
+
+def smoothing_factor(cutoff, dt):
+    tau = 1 / (2 * np.pi * cutoff)
+    return 1 / (1 + tau / dt)
+
+
+class OutputFilter:
+    """Smooths the whole output vector with one set of array operations.
+
+    Settings are compiled into per-output arrays whenever the configs
+    change. Only outputs whose smoothing settings changed restart their
+    filters, and the result is clipped to the bounds of outputs that
+    clamp, since a Kalman estimate overshoots. Each filter runs over the
+    whole vector if any output uses it and the configured result is
+    selected per output, the vectors are far too short for that to cost
+    more than indexing would.
+
+    Non-finite measurements pass through unfiltered and leave the state
+    as it was, an output that has no state yet starts with its first
+    finite measurement.
+    """
+
+    def __init__(self):
+        self.configs = None
+        self.revision = None
+        self.active = False
+        self.output_ids = None
+        self.settings = None
+        self.last_timestamp = None
+
+    def compile(self, configs):
+        options = configs.output_smoothing
+        settings = np.array(
+            [
+                [option.filter_type.value]
+                + [getattr(option, name) for name in SETTING_FIELDS]
+                for option in options
+            ],
+            dtype=np.float64,
+        ).reshape(len(options), len(SETTING_FIELDS) + 1)
+        if (
+            self.last_timestamp is not None
+            and configs.output_ids == self.output_ids
+        ):
+            # Restarted with the next measurement
+            self.stale |= np.any(settings != self.settings, axis=1)
+        else:
+            self.last_timestamp = None
+        self.settings = settings
+        self.output_ids = configs.output_ids
+
+        filter_types = settings[:, 0]
+        self.euro_mask = filter_types == FilterType.ONE_EURO.value
+        self.kalman_mask = filter_types == FilterType.KALMAN.value
+        self.euro_active = bool(self.euro_mask.any())
+        self.kalman_active = bool(self.kalman_mask.any())
+        self.active = self.euro_active or self.kalman_active
+
+        min_cutoff, beta, d_cutoff, process_noise, measurement_noise = (
+            settings[:, 1:].T.copy()
+        )
+        self.min_cutoff = np.maximum(min_cutoff, MIN_CUTOFF_HZ)
+        self.beta = beta
+        self.d_cutoff = np.maximum(d_cutoff, MIN_CUTOFF_HZ)
+        self.process_noise = np.maximum(process_noise, 0.0)
+        self.measurement_noise = np.maximum(
+            measurement_noise, MIN_MEASUREMENT_NOISE
+        )
+
+        self.lower = np.full(len(options), -np.inf)
+        self.upper = np.full(len(options), np.inf)
+        for idx, parameter in enumerate(configs.parameters):
+            if parameter.parameter.clamp:
+                self.lower[idx] = parameter.parameter.min_val
+                self.upper[idx] = parameter.parameter.max_val
+        self.configs = configs
+        self.revision = configs.revision
+
+    def reset(self, values, timestamp):
+        self.last_timestamp = timestamp
+        self.stale = ~np.isfinite(values)
+        # Placeholders until restart_stale sees a finite value
+        values = np.where(self.stale, 0.0, values)
+        # One Euro state
+        self.euro_value = values.copy()
+        self.euro_derivative = np.zeros_like(values)
+        # Kalman state and covariance, P is symmetric
+        self.kalman_value = values.copy()
+        self.kalman_velocity = np.zeros_like(values)
+        self.p00 = self.measurement_noise.copy()
+        self.p01 = np.zeros_like(values)
+        self.p11 = np.full_like(values, INITIAL_VELOCITY_VARIANCE)
+
+    def restart_stale(self, values):
+        stale = self.stale & np.isfinite(values)
+        self.euro_value[stale] = values[stale]
+        self.euro_derivative[stale] = 0
+        self.kalman_value[stale] = values[stale]
+        self.kalman_velocity[stale] = 0
+        self.p00[stale] = self.measurement_noise[stale]
+        self.p01[stale] = 0
+        self.p11[stale] = INITIAL_VELOCITY_VARIANCE
+        self.stale &= ~stale
+
+    def apply(self, configs, values, timestamp):
+        """Filtered values in the order of configs.output_ids."""
+        if configs is not self.configs or configs.revision != self.revision:
+            self.compile(configs)
+        # Configs edited after the values were computed apply next frame
+        if not self.active or len(values) != len(self.settings):
+            return values
+        measured = np.array(values, dtype=np.float64)
+        if self.last_timestamp is None:
+            self.reset(measured, timestamp)
+            return values
+        dt = max((timestamp - self.last_timestamp) / 1000, MIN_DT_SEC)
+        self.last_timestamp = timestamp
+        if self.stale.any():
+            self.restart_stale(measured)
+        finite = np.isfinite(measured)
+        all_finite = bool(finite.all())
+
+        if self.euro_active:
+            # One Euro: the cutoff rises with the filtered speed
+            euro_measured = measured
+            if not all_finite:
+                # Measuring the state itself leaves it in place
+                euro_measured = np.where(finite, measured, self.euro_value)
+            derivative = (euro_measured - self.euro_value) / dt
+            self.euro_derivative += smoothing_factor(self.d_cutoff, dt) * (
+                derivative - self.euro_derivative
+            )
+            cutoff = self.min_cutoff + self.beta * np.abs(self.euro_derivative)
+            self.euro_value += smoothing_factor(cutoff, dt) * (
+                euro_measured - self.euro_value
+            )
+
+        if self.kalman_active:
+            # Kalman predict
+            self.kalman_value += self.kalman_velocity * dt
+            q = self.process_noise
+            p00 = (
+                self.p00
+                + 2 * dt * self.p01
+                + dt * dt * self.p11
+                + q * dt**3 / 3
+            )
+            p01 = self.p01 + dt * self.p11 + q * dt**2 / 2
+            p11 = self.p11 + q * dt
+            # Kalman update, skipped for non-finite measurements
+            innovation = measured - self.kalman_value
+            gain0 = p00 / (p00 + self.measurement_noise)
+            gain1 = p01 / (p00 + self.measurement_noise)
+            if not all_finite:
+                innovation = np.where(finite, innovation, 0.0)
+                gain0 = np.where(finite, gain0, 0.0)
+                gain1 = np.where(finite, gain1, 0.0)
+            self.kalman_value += gain0 * innovation
+            self.kalman_velocity += gain1 * innovation
+            self.p00 = (1 - gain0) * p00
+            self.p01 = (1 - gain0) * p01
+            self.p11 = p11 - gain1 * p01
+
+        filtered = np.where(self.euro_mask, self.euro_value, measured)
+        filtered = np.where(self.kalman_mask, self.kalman_value, filtered)
+        if not all_finite:
+            filtered = np.where(finite, filtered, measured)
+        np.clip(filtered, self.lower, self.upper, out=filtered)
+        return filtered.tolist()
@@ -0,0 +1,109 @@
+from threading import Lock
+import numpy as np
+from computation.compute_parameters import ParameterOutputs
+
+# Floor for the time between frames, repeated timestamps must not divide
+# by zero
+MIN_DT_SEC = 1e-3
+# Frames older than this are assumed to come from another timebase, e.g. a
+# replayed recording, and only get the configured lead
+MAX_FRAME_AGE_MS = 1000
+
+
+class OutputPredictor:
+    """Extrapolates outputs to the time VTube Studio will show them.
+
+    observe() estimates a smoothed per-output velocity from every computed
+    frame, predict() moves the frame that is about to be sent along it by
+    the frame's age plus the lead time. To keep the prediction from
+    overshooting, the horizon is capped at max_horizon_ms, an output's
+    velocity is dropped when its direction reverses, and predictions are
+    clamped to the min and max of parameters that clamp. A non-finite
+    value drops its output's velocity and is not used for the next one.
+    """
+
+    def __init__(
+        self,
+        configs,
+        lead_ms: float = 0.0,
+        max_horizon_ms: float = 100.0,
+        velocity_smoothing: float = 0.5,
+    ):
+        self.configs = configs
+        self.lead_ms = lead_ms
+        self.max_horizon_ms = max_horizon_ms
+        self.velocity_smoothing = velocity_smoothing
+        # observe runs on the compute thread, predict on the VTS sender
+        self.lock = Lock()
+        self.output_ids = None
+        self.last_values = None
+        self.last_times = None
+        self.velocity = None
+        self.bounds_revision = None
+
+    def compile_bounds(self):
+        configs = self.configs
+        lower = np.full(len(configs.output_ids), -np.inf)
+        upper = np.full(len(configs.output_ids), np.inf)
+        for idx, parameter in enumerate(configs.parameters):
+            if parameter.parameter.clamp:
+                lower[idx] = parameter.parameter.min_val
+                upper[idx] = parameter.parameter.max_val
+        self.lower = lower
+        self.upper = upper
+        self.bounds_ids = configs.output_ids
+        self.bounds_revision = configs.revision
+
+    def observe(self, outputs: ParameterOutputs):
+        values = np.array(outputs.values, dtype=np.float64)
+        finite = np.isfinite(values)
+        with self.lock:
+            if (
+                self.last_values is None
+                or outputs.output_ids != self.output_ids
+            ):
+                self.output_ids = outputs.output_ids
+                self.velocity = np.zeros_like(values)
+                self.last_values = np.where(finite, values, np.nan)
+                self.last_times = np.full_like(values, outputs.timestamp)
+            else:
+                # Per output, skipped values leave a longer gap
+                dt = np.maximum(
+                    (outputs.timestamp - self.last_times) / 1000, MIN_DT_SEC
+                )
+                velocity = (values - self.last_values) / dt
+                # NaN where either value was non-finite
+                valid = np.isfinite(velocity)
+                velocity = np.where(valid, velocity, 0.0)
+                smoothed = self.velocity + self.velocity_smoothing * (
+                    velocity - self.velocity
+                )
+                # Turning points are where extrapolation overshoots most
+                self.velocity = np.where(
+                    ~valid | (velocity * self.velocity < 0), 0.0, smoothed
+                )
+                self.last_values = np.where(finite, values, self.last_values)
+                self.last_times = np.where(
+                    finite, outputs.timestamp, self.last_times
+                )
+
+    def predict(self, outputs: ParameterOutputs, now_ns: int):
+        """Outputs moved to now plus the lead time."""
+        with self.lock:
+            if outputs.output_ids != self.output_ids:
+                return outputs
+            velocity = self.velocity
+        if self.configs.revision != self.bounds_revision:
+            self.compile_bounds()
+
+        age_ms = now_ns / 1e6 - outputs.timestamp
+        if not 0 <= age_ms <= MAX_FRAME_AGE_MS:
+            age_ms = 0
+        horizon_ms = min(age_ms + self.lead_ms, self.max_horizon_ms)
+        predicted = np.array(outputs.values, dtype=np.float64)
+        predicted += velocity * (horizon_ms / 1000)
+        if outputs.output_ids == self.bounds_ids:
+            np.clip(predicted, self.lower, self.upper, out=predicted)
+        return ParameterOutputs(
+            outputs.output_ids, predicted.tolist(), outputs.timestamp
+        )
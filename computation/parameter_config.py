@@ -1,36 +1,56 @@
 from computation.parameters import (
     LandmarkCalculateOption,
+    GeometryBackend,
     InputBlendshapeOption,
     ParameterType,
     Parameter,
 )
+from computation.blendshape_plan import BlendshapePlan
+from computation.output_filter import FilterOptions
 import os
 import json
 
+# Outputs computed from the facial transformation matrix, sent after the
+# configured parameters
+FACE_POSE_OUTPUT_IDS = (
+    "FacePositionX",
+    "FacePositionY",
+    "FacePositionZ",
+    "FaceAngleX",
+    "FaceAngleY",
+    "FaceAngleZ",
+)
+
 
 class ParameterConfigs:
     def __init__(self, params_file="parameters.json"):
         self.parameters = []
         self.face_position_offset: tuple[float, float, float] = (0.0, 0.0, 0.0)
         self.face_rotation_offset: tuple[float, float, float] = (0.0, 0.0, 0.0)
+        self.geometry_backend = GeometryBackend.REFERENCE
+        # Shared by all FACE_POSE_OUTPUT_IDS
+        self.pose_smoothing = FilterOptions()
         self.params_file = params_file
+        self.revision = 0
+        self.compiled_plan = None
+        self.compiled_output_ids = (0, ())
         self.init()
 
+    def serialize(self):
+        parameters_out = []
+        for parameter in self.parameters:
+            parameters_out.append(parameter.serialize())
+        return {
+            "parameters": parameters_out,
+            "face_position_offset": self.face_position_offset,
+            "face_rotation_offset": self.face_rotation_offset,
+            "geometry_backend": self.geometry_backend.name,
+            "pose_smoothing": self.pose_smoothing.serialize(),
+        }
+
     def file_save(self):
         with open(self.params_file, "w") as fp:
-            parameters_out = []
-            for parameter in self.parameters:
-                parameters_out.append(parameter.serialize())
-            fp.write(
-                json.dumps(
-                    {
-                        "parameters": parameters_out,
-                        "face_position_offset": self.face_position_offset,
-                        "face_rotation_offset": self.face_rotation_offset,
-                    },
-                    indent=4,
-                )
-            )
+            fp.write(json.dumps(self.serialize(), indent=4))
 
     def config_reset(self):
         self.parameters.clear()
@@ -39,27 +59,110 @@ class ParameterConfigs:
     def config_defaults(self):
         self.parameters.clear()
         self.default_init()
+        self.mark_changed()
 
     def init(self):
         if os.path.isfile(self.params_file):
             self.file_init()
         else:
             self.default_init()
+        self.mark_changed()
+
+    def mark_changed(self):
+        self.revision += 1
+        # Edits to any parameter's tunable fields count as a change too
+        for parameter in self.parameters:
+            parameter.parameter.on_change = self.mark_changed
+            parameter.parameter.smoothing.on_change = self.mark_changed
+        self.pose_smoothing.on_change = self.mark_changed
+
+    @property
+    def output_ids(self) -> tuple[str, ...]:
+        # The same tuple is returned until the config changes
+        revision, output_ids = self.compiled_output_ids
+        if revision != self.revision:
+            output_ids = (
+                tuple(
+                    parameter.parameter.output_id
+                    for parameter in self.parameters
+                )
+                + FACE_POSE_OUTPUT_IDS
+            )
+            self.compiled_output_ids = (self.revision, output_ids)
+        return output_ids
+
+    def snapshot(self):
+        """Parameters, output ids and blendshape plan of one revision.
+
+        The GUI can reset or reload the configs while a frame is computed,
+        so they are read again until nothing changed in between.
+        """
+        while True:
+            revision = self.revision
+            parameters = tuple(self.parameters)
+            output_ids = self.output_ids
+            blendshape_plan = self.blendshape_plan
+            if revision == self.revision and len(output_ids) == len(
+                parameters
+            ) + len(FACE_POSE_OUTPUT_IDS):
+                return parameters, output_ids, blendshape_plan
+
+    @property
+    def output_smoothing(self) -> list[FilterOptions]:
+        # Ordered like output_ids
+        return [
+            parameter.parameter.smoothing for parameter in self.parameters
+        ] + [self.pose_smoothing] * len(FACE_POSE_OUTPUT_IDS)
+
+    @property
+    def blendshape_plan(self) -> BlendshapePlan:
+        # Recompiled whenever a parameter is edited or the config reloaded
+        if self.compiled_plan is None or (
+            self.compiled_plan.revision != self.revision
+        ):
+            blendshape_parameters = []
+            for parameter in self.parameters:
+                if parameter.parameter_type == ParameterType.BLENDSHAPE:
+                    blendshape_parameters.append(parameter.parameter)
+            self.compiled_plan = BlendshapePlan(
+                blendshape_parameters, self.revision
+            )
+        return self.compiled_plan
 
     def file_init(self):
         with open(self.params_file, "r") as fp:
             params_data = json.load(fp)
-            for parameter in params_data["parameters"]:
-                new_param = Parameter(**parameter)
-                self.parameters.append(new_param)
-            if "face_position_offset" in params_data:
-                self.face_position_offset = tuple(
-                    params_data["face_position_offset"]
-                )
-            if "face_rotation_offset" in params_data:
-                self.face_rotation_offset = tuple(
-                    params_data["face_rotation_offset"]
-                )
+        self.dict_init(params_data)
+
+    def dict_init(self, params_data):
+        for parameter in params_data["parameters"]:
+            new_param = Parameter(**parameter)
+            self.parameters.append(new_param)
+        if "face_position_offset" in params_data:
+            self.face_position_offset = tuple(
+                params_data["face_position_offset"]
+            )
+        if "face_rotation_offset" in params_data:
+            self.face_rotation_offset = tuple(
+                params_data["face_rotation_offset"]
+            )
+        if "geometry_backend" in params_data:
+            self.geometry_backend = GeometryBackend[
+                params_data["geometry_backend"]
+            ]
+        if "pose_smoothing" in params_data:
+            self.pose_smoothing = FilterOptions.from_value(
+                params_data["pose_smoothing"]
+            )
+
+    @classmethod
+    def from_dict(cls, params_data):
+        # Built without touching any parameters file
+        configs = cls(params_file="")
+        configs.parameters.clear()
+        configs.dict_init(params_data)
+        configs.mark_changed()
+        return configs
 
     def default_init(self):
         self.parameters.append(
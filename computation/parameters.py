@@ -2,9 +2,16 @@ from enum import Enum
 import numpy as np
 from skimage.measure import EllipseModel
 from scipy.spatial import ConvexHull
+from computation.geometry_cache import GeometryCache
+from computation.landmark_parser import contour_set_name
+from computation import fast_geometry
+from computation.output_filter import FilterOptions
 
 
 class BaseParameter:
+    # Fields that compiled parameter plans depend on
+    TUNABLE_FIELDS = ("scale", "offset", "clamp", "min_val", "max_val")
+
     # min and max only used if clamp is true
     def __init__(
         self,
@@ -15,7 +22,10 @@ class BaseParameter:
         clamp: bool = True,
         min_val: float = 0.0,
         max_val: float = 1.0,
+        smoothing: FilterOptions | dict | None = None,
     ):
+        self.on_change = None
+        self.smoothing = FilterOptions.from_value(smoothing)
         self.name = name
         self.output_id = output_id
         self.scale = scale
@@ -27,14 +37,28 @@ class BaseParameter:
             self.min_val <= self.max_val
         ), "Min value for parameter must be less than max value"
 
+    def __setattr__(self, name, value):
+        if (
+            name in BaseParameter.TUNABLE_FIELDS
+            and self.on_change is not None
+            and getattr(self, name) != value
+        ):
+            super().__setattr__(name, value)
+            self.on_change()
+            return
+        super().__setattr__(name, value)
+
     def set_clamp(self, state):
         self.clamp = state
 
-    def compute_value(self):
+    def output_value(self):
         value = (self.value - self.offset) * self.scale
         if self.clamp:
             value = max(min(value, self.max_val), self.min_val)
-        return [{"id": self.output_id, "value": value}]
+        return value
+
+    def compute_value(self):
+        return [{"id": self.output_id, "value": self.output_value()}]
 
     def serialize(self):
         param_dict = {
@@ -45,6 +69,7 @@ class BaseParameter:
             "clamp": self.clamp,
             "min_val": self.min_val,
             "max_val": self.max_val,
+            "smoothing": self.smoothing.serialize(),
         }
         return param_dict
 
@@ -76,9 +101,10 @@ class BlendshapeParameter(BaseParameter):
         clamp: bool = True,
         min_val: float = 0.0,
         max_val: float = 1.0,
+        smoothing: FilterOptions | dict | None = None,
     ):
         super().__init__(
-            name, output_id, scale, offset, clamp, min_val, max_val
+            name, output_id, scale, offset, clamp, min_val, max_val, smoothing
         )
         self.input_parameters = []
         for parameter in input_parameters:
@@ -116,6 +142,13 @@ class LandmarkCalculateOption(Enum):
     HULL_CALCULATION = 2
 
 
+class GeometryBackend(Enum):
+    # skimage EllipseModel and scipy ConvexHull
+    REFERENCE = 1
+    # closed form NumPy ellipse fit and contour polygon area
+    FAST = 2
+
+
 class LandmarkParameter(BaseParameter):
     def __init__(
         self,
@@ -128,9 +161,10 @@ class LandmarkParameter(BaseParameter):
         clamp: bool = True,
         min_val: float = 0.0,
         max_val: float = 1.0,
+        smoothing: FilterOptions | dict | None = None,
     ):
         super().__init__(
-            name, output_id, scale, offset, clamp, min_val, max_val
+            name, output_id, scale, offset, clamp, min_val, max_val, smoothing
         )
         self.input_landmark_set = input_landmark_set
         if type(calculate_option) is str:
@@ -141,15 +175,18 @@ class LandmarkParameter(BaseParameter):
             self.calculate_option = calculate_option
 
     def calculate_ellipse_minor_major_ratio(self, landmark_points):
-        ellipse_array = np.array(landmark_points)
+        ellipse_array = np.asarray(landmark_points)
         model = EllipseModel.from_estimate(ellipse_array)
         a, b = model.axis_lengths
         return b / a
 
     def get_hull(self, points):
-        point_array = np.array(points)
+        point_array = np.asarray(points)
         return ConvexHull(points=point_array)
 
+    def calculate_hull_area(self, points):
+        return self.get_hull(points).area
+
     def calculate_hull(self, landmark_points, oval_points):
         face_hull = self.get_hull(oval_points)
         landmark_hull = self.get_hull(landmark_points)
@@ -158,16 +195,73 @@ class LandmarkParameter(BaseParameter):
             landmark_share = landmark_hull.area / face_hull.area
         return landmark_share
 
-    def compute_value(self, landmark_sets: dict):
-        landmark_points = landmark_sets[self.input_landmark_set]
+    def calculate_fast_hull_share(self, geometry_cache: GeometryCache):
+        landmark_contour = contour_set_name(self.input_landmark_set)
+        if landmark_contour is None:
+            # No ordered contour for this set, use the reference hull
+            return self.calculate_hull_share(geometry_cache)
+        landmark_area = geometry_cache.get(
+            landmark_contour,
+            self.calculate_option,
+            fast_geometry.polygon_area,
+        )
+        face_area = geometry_cache.get(
+            "face_oval_contour_xyz",
+            self.calculate_option,
+            fast_geometry.polygon_area,
+        )
+        if face_area > 0:
+            return landmark_area / face_area
+        return 0
+
+    def calculate_hull_share(self, geometry_cache: GeometryCache):
+        landmark_area = geometry_cache.get(
+            self.input_landmark_set,
+            self.calculate_option,
+            self.calculate_hull_area,
+        )
+        face_area = geometry_cache.get(
+            "face_oval_xyz",
+            self.calculate_option,
+            self.calculate_hull_area,
+        )
+        if face_area > 0:
+            return landmark_area / face_area
+        return 0
+
+    def calculate(
+        self,
+        landmark_sets,
+        geometry_cache: GeometryCache | None = None,
+        geometry_backend: GeometryBackend = GeometryBackend.REFERENCE,
+    ):
+        if geometry_cache is None:
+            geometry_cache = GeometryCache(landmark_sets)
+        use_fast = geometry_backend == GeometryBackend.FAST
         match self.calculate_option:
             case LandmarkCalculateOption.ELLIPSE_FIT:
-                self.value = self.calculate_ellipse_minor_major_ratio(
-                    landmark_points
+                calculate_ratio = self.calculate_ellipse_minor_major_ratio
+                if use_fast:
+                    calculate_ratio = fast_geometry.ellipse_minor_major_ratio
+                self.value = geometry_cache.get(
+                    self.input_landmark_set,
+                    self.calculate_option,
+                    calculate_ratio,
                 )
             case LandmarkCalculateOption.HULL_CALCULATION:
-                oval_points = landmark_sets["face_oval_xyz"]
-                self.value = self.calculate_hull(landmark_points, oval_points)
+                if use_fast:
+                    self.value = self.calculate_fast_hull_share(geometry_cache)
+                else:
+                    self.value = self.calculate_hull_share(geometry_cache)
+        return self.value
+
+    def compute_value(
+        self,
+        landmark_sets,
+        geometry_cache: GeometryCache | None = None,
+        geometry_backend: GeometryBackend = GeometryBackend.REFERENCE,
+    ):
+        self.calculate(landmark_sets, geometry_cache, geometry_backend)
         return super().compute_value()
 
     def serialize(self):
@@ -0,0 +1,73 @@
+import numpy as np
+from computation.blendshape_names import BLENDSHAPE_NAMES
+
+
+class ResultHistory:
+    """Fixed-size ring buffer of the latest output and blendshape values.
+
+    Every output and blendshape has its own contiguous row, so the GUI can
+    plot row views directly with the ring offset instead of copying. The
+    rows are only reallocated when the set of outputs changes.
+
+    Written by the compute thread and read by the GUI without a lock, a
+    plot may show one sample that is still being written.
+    """
+
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self.times = np.full(capacity, np.nan)
+        self.blendshapes = np.full((len(BLENDSHAPE_NAMES), capacity), np.nan)
+        self.output_ids = ()
+        self.outputs = np.full((0, capacity), np.nan)
+        # Index the next sample is written to
+        self.head = 0
+        self.count = 0
+
+    def reset(self, output_ids):
+        self.count = 0
+        self.head = 0
+        self.times.fill(np.nan)
+        self.blendshapes.fill(np.nan)
+        self.outputs = np.full((len(output_ids), self.capacity), np.nan)
+        self.output_ids = output_ids
+
+    def append(self, outputs, blendshapes, timestamp):
+        if outputs.output_ids != self.output_ids:
+            self.reset(outputs.output_ids)
+        head = self.head
+        # Seconds, so plots read naturally
+        self.times[head] = timestamp / 1000
+        self.outputs[:, head] = outputs.values
+        self.blendshapes[:, head] = blendshapes
+        self.head = (head + 1) % self.capacity
+        self.count = min(self.count + 1, self.capacity)
+
+    def view(self):
+        """Times, outputs, blendshapes, output ids and the ring offset.
+
+        Rows only cover written samples, the oldest sample is at the
+        offset.
+        """
+        count = self.count
+        head = self.head
+        if count < self.capacity:
+            return (
+                self.times[:count],
+                self.outputs[:, :count],
+                self.blendshapes[:, :count],
+                self.output_ids,
+                0,
+            )
+        return (
+            self.times,
+            self.outputs,
+            self.blendshapes,
+            self.output_ids,
+            head,
+        )
+
+    @property
+    def latest_time(self):
+        if self.count == 0:
+            return None
+        return float(self.times[(self.head - 1) % self.capacity])
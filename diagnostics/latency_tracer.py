@@ -0,0 +1,168 @@
+import math
+import signal
+import time
+from threading import Lock, Thread
+
+# Stage boundaries a frame passes, in order
+STAGES = ("capture", "submit", "detected", "computed", "sent")
+# Frames still being tracked, older ones are forgotten (e.g. coalesced)
+MAX_TRACKED_FRAMES = 64
+# Sub buckets per power of two, bounds the relative error to 1 / 32
+SUB_BUCKETS = 32
+MAX_EXPONENT = 40
+# Histograms report the current and the previous window
+WINDOW_SEC = 60.0
+
+
+class LogHistogram:
+    """Log-linear bucketed histogram of microsecond values (HDR style)."""
+
+    def __init__(self):
+        self.counts = [0] * (MAX_EXPONENT * SUB_BUCKETS)
+        self.total = 0
+        self.max_value = 0.0
+
+    def bucket_index(self, value):
+        if value < 1.0:
+            return 0
+        mantissa, exponent = math.frexp(value)
+        sub_bucket = int((mantissa - 0.5) * 2 * SUB_BUCKETS)
+        return min(exponent * SUB_BUCKETS + sub_bucket, len(self.counts) - 1)
+
+    def bucket_value(self, index):
+        # Middle of the bucket
+        exponent, sub_bucket = divmod(index, SUB_BUCKETS)
+        mantissa = 0.5 + (sub_bucket + 0.5) / (2 * SUB_BUCKETS)
+        return math.ldexp(mantissa, exponent)
+
+    def record(self, value):
+        self.counts[self.bucket_index(value)] += 1
+        self.total += 1
+        if value > self.max_value:
+            self.max_value = value
+
+    def reset(self):
+        self.counts = [0] * len(self.counts)
+        self.total = 0
+        self.max_value = 0.0
+
+
+class RollingHistogram:
+    def __init__(self, window_sec=WINDOW_SEC):
+        self.window_ns = int(window_sec * 1e9)
+        self.current = LogHistogram()
+        self.previous = LogHistogram()
+        self.window_start_ns = time.monotonic_ns()
+
+    def record(self, value, now_ns):
+        elapsed_ns = now_ns - self.window_start_ns
+        if elapsed_ns > self.window_ns:
+            self.current, self.previous = self.previous, self.current
+            self.current.reset()
+            if elapsed_ns > 2 * self.window_ns:
+                # Nothing was recorded during the previous window either
+                self.previous.reset()
+            self.window_start_ns = now_ns
+        self.current.record(value)
+
+    @property
+    def total(self):
+        return self.current.total + self.previous.total
+
+    @property
+    def max_value(self):
+        return max(self.current.max_value, self.previous.max_value)
+
+    def percentiles(self, quantiles):
+        total = self.total
+        max_value = self.max_value
+        targets = [max(1, math.ceil(q * total)) for q in quantiles]
+        results = []
+        cumulative = 0
+        target_idx = 0
+        for index, (current, previous) in enumerate(
+            zip(self.current.counts, self.previous.counts)
+        ):
+            cumulative += current + previous
+            while target_idx < len(targets) and (
+                cumulative >= targets[target_idx]
+            ):
+                results.append(
+                    min(self.current.bucket_value(index), max_value)
+                )
+                target_idx += 1
+            if target_idx == len(targets):
+                break
+        return results
+
+
+class LatencyTracer:
+    """Stamps frames at each stage boundary and keeps per stage histograms.
+
+    Frames are keyed by their mediapipe timestamp. Each mark records the
+    time since the frame's previous mark under "<previous>-><stage>", and
+    reaching the last stage records the time since capture under
+    "end_to_end". Without a VTS connection the last stage is "computed".
+    """
+
+    def __init__(self, last_stage=STAGES[-1], window_sec=WINDOW_SEC):
+        self.last_stage = last_stage
+        self.window_sec = window_sec
+        self.lock = Lock()
+        self.frames = {}
+        self.histograms = {}
+
+    def mark(self, timestamp, stage, now_ns=None):
+        if now_ns is None:
+            now_ns = time.monotonic_ns()
+        with self.lock:
+            frame = self.frames.get(timestamp)
+            if frame is None:
+                if len(self.frames) >= MAX_TRACKED_FRAMES:
+                    del self.frames[next(iter(self.frames))]
+                self.frames[timestamp] = (stage, now_ns, now_ns)
+                return
+            previous_stage, previous_ns, first_ns = frame
+            self.record(
+                f"{previous_stage}->{stage}", now_ns - previous_ns, now_ns
+            )
+            if stage == self.last_stage:
+                self.record("end_to_end", now_ns - first_ns, now_ns)
+                del self.frames[timestamp]
+            else:
+                self.frames[timestamp] = (stage, now_ns, first_ns)
+
+    def record(self, name, elapsed_ns, now_ns):
+        histogram = self.histograms.get(name)
+        if histogram is None:
+            histogram = RollingHistogram(self.window_sec)
+            self.histograms[name] = histogram
+        histogram.record(elapsed_ns / 1000, now_ns)
+
+    def report(self):
+        lines = [
+            f"{'stage':<22}{'count':>8}{'p50 ms':>10}{'p95 ms':>10}"
+            f"{'p99 ms':>10}{'max ms':>10}"
+        ]
+        with self.lock:
+            for name, histogram in self.histograms.items():
+                if histogram.total == 0:
+                    continue
+                p50, p95, p99 = histogram.percentiles((0.5, 0.95, 0.99))
+                lines.append(
+                    f"{name:<22}{histogram.total:>8}{p50 / 1000:>10.2f}"
+                    f"{p95 / 1000:>10.2f}{p99 / 1000:>10.2f}"
+                    f"{histogram.max_value / 1000:>10.2f}"
+                )
+        return "\n".join(lines)
+
+    def install_signal_handler(self):
+        # SIGUSR1 doesn't exist on Windows, the report is still printed on
+        # exit there
+        if hasattr(signal, "SIGUSR1"):
+            signal.signal(signal.SIGUSR1, self.handle_signal)
+
+    def handle_signal(self, signum, frame):
+        # Signal handlers run on the main thread, which may be inside mark()
+        # holding the lock, so the report is built on its own thread
+        Thread(target=lambda: print(self.report()), daemon=True).start()
@@ -1,13 +1,32 @@
 import argparse
 from vision.capture_device import CaptureDevice
+from vision.detection_scheduler import DetectionScheduler
 from vision.mp_processor import MPProcessor
+from vision.roi_cropper import RoiCropper
 from communication.vtube_studio_interface import VTSInterface
-from computation.compute_parameters import ParameterComputer
+from diagnostics.latency_tracer import LatencyTracer
+from recording.detection_recording import (
+    DetectionRecorder,
+    DetectionReplayer,
+)
+from recording.session_store import SessionRecorder
+from computation.compute_worker import ComputeWorker
+from computation.multi_face import MultiFaceComputer
+from computation.result_history import ResultHistory
+from computation.output_predictor import OutputPredictor
 from websockets.exceptions import ConnectionClosedOK
+from workers.camera_pool import CameraPool
+from workers.camera_worker import CameraWorkerOptions
 from application.application import Application
+import os
+import time
 import traceback
 from threading import Thread
 
+# How long the detection loop waits for a frame before rechecking the
+# connection
+FRAME_TIMEOUT_SEC = 1.0
+
 
 class ConnectionMonitor:
     def __init__(self):
@@ -31,8 +50,9 @@ def get_args():
     parser.add_argument(
         "-a",
         "--auth_file",
-        help="json file containing vtube studio auth token",
-        default="auth.json",
+        nargs="+",
+        help="json file containing vtube studio auth token, one per address",
+        default=["auth.json"],
     )
     parser.add_argument(
         "-m",
@@ -42,12 +62,34 @@ def get_args():
     )
     parser.add_argument(
         "--address",
-        help="API address for VTube Studio",
-        default="ws://localhost:8001",
+        nargs="+",
+        help="API address for VTube Studio, one per tracked face",
+        default=["ws://localhost:8001"],
+    )
+    parser.add_argument(
+        "--num-faces",
+        type=int,
+        help="number of faces to track, each is sent to its own address",
+        default=1,
+    )
+    parser.add_argument(
+        "--params-file",
+        nargs="+",
+        help="parameter config file, one per tracked face, faces without "
+        "their own use the last",
+        default=["parameters.json"],
     )
     parser.add_argument(
         "-c", "--camera", type=int, help="index of camera device", default=0
     )
+    parser.add_argument(
+        "--cameras",
+        type=int,
+        nargs="+",
+        help="camera indices to run in one worker process each, sent to "
+        "the addresses in the same order",
+        default=None,
+    )
     parser.add_argument(
         "-W", "--width", type=int, help="width of camera image", default=1280
     )
@@ -57,6 +99,76 @@ def get_args():
     parser.add_argument(
         "-f", "--fps", type=int, help="frame rate of the camera", default=30
     )
+    parser.add_argument(
+        "--fourcc",
+        help="camera pixel format to request, e.g. MJPG or YUYV",
+        default=None,
+    )
+    parser.add_argument(
+        "--buffer-size",
+        type=int,
+        help="number of frames the camera driver may buffer",
+        default=None,
+    )
+    parser.add_argument(
+        "--capture-backend",
+        help="OpenCV capture backend",
+        choices=["any", "v4l2", "gstreamer"],
+        default="any",
+    )
+    parser.add_argument(
+        "--grab-retrieve",
+        help="Grab every camera frame but only decode the ones used",
+        default=False,
+        action="store_true",
+    )
+    parser.add_argument(
+        "--roi",
+        help="Run inference on a crop around the last detected face",
+        default=False,
+        action="store_true",
+    )
+    parser.add_argument(
+        "--roi-size",
+        type=int,
+        help="side length in pixels the face crop is resized to",
+        default=320,
+    )
+    parser.add_argument(
+        "--roi-padding",
+        type=float,
+        help="padding added on each side of the face box, as a fraction "
+        "of its size",
+        default=0.5,
+    )
+    parser.add_argument(
+        "--trace",
+        help="Trace per stage frame latency, printed on exit and on SIGUSR1",
+        default=False,
+        action="store_true",
+    )
+    parser.add_argument(
+        "--record",
+        help="directory to record detection results to",
+        default=None,
+    )
+    parser.add_argument(
+        "--replay",
+        help="directory of a recording to replay instead of the camera",
+        default=None,
+    )
+    parser.add_argument(
+        "--replay-fast",
+        help="replay as fast as possible instead of in real time",
+        default=False,
+        action="store_true",
+    )
+    parser.add_argument(
+        "--session-record",
+        help="directory to record landmarks, blendshapes, pose and outputs "
+        "of every frame to",
+        default=None,
+    )
     parser.add_argument("-g", "--use-gpu", default=False, action="store_true")
     parser.add_argument(
         "--run-offline",
@@ -70,58 +182,326 @@ def get_args():
         default=False,
         action="store_true",
     )
-    return parser.parse_args()
+    parser.add_argument(
+        "--gui-fps",
+        help="maximum GUI frame rate, the GUI only redraws on input or new "
+        "results",
+        default=60,
+        type=float,
+    )
+    parser.add_argument(
+        "--gui-results-fps",
+        help="maximum rate the GUI picks up new tracking results",
+        default=30,
+        type=float,
+    )
+    parser.add_argument(
+        "--predict",
+        help="extrapolate outputs to the time they are sent to VTube Studio",
+        default=False,
+        action="store_true",
+    )
+    parser.add_argument(
+        "--predict-lead-ms",
+        help="extra time to extrapolate past sending, e.g. VTube Studio's "
+        "render delay",
+        default=0.0,
+        type=float,
+    )
+    parser.add_argument(
+        "--predict-max-ms",
+        help="longest extrapolation, limits overshoot",
+        default=100.0,
+        type=float,
+    )
+    parser.add_argument(
+        "--history-sec",
+        help="seconds of outputs and blendshapes the GUI plots, 0 disables",
+        default=10,
+        type=float,
+    )
+    args = parser.parse_args()
+    if args.fourcc is not None and len(args.fourcc) != 4:
+        parser.error("--fourcc must be 4 characters, e.g. MJPG")
+    if args.cameras is not None:
+        # Camera workers run capture and detection without these stages
+        unsupported = [
+            option
+            for option, used in (
+                ("--trace", args.trace),
+                ("--roi", args.roi),
+                ("--record", args.record is not None),
+                ("--session-record", args.session_record is not None),
+                ("--replay", args.replay is not None),
+                ("--num-faces", args.num_faces != 1),
+                ("--params-file", args.params_file != ["parameters.json"]),
+            )
+            if used
+        ]
+        if len(unsupported) > 0:
+            parser.error(
+                f"{', '.join(unsupported)} cannot be used with --cameras"
+            )
+    return args
 
 
-def main(args):
-    # Init capture device
-    capture = CaptureDevice(args.camera, args.width, args.height, args.fps)
+def face_auth_file(auth_files, face_id):
+    # Extra addresses without their own auth file get a numbered copy
+    if face_id < len(auth_files):
+        return auth_files[face_id]
+    root, ext = os.path.splitext(auth_files[-1])
+    return f"{root}_{face_id}{ext}"
+
 
-    # Init Websocket Connection
+def create_history(args):
+    # Sized for the camera frame rate, faster replays cover less time
+    if args.history_sec <= 0:
+        return None
+    return ResultHistory(max(1, round(args.history_sec * args.fps)))
+
+
+def create_predictor(args, configs):
+    if not args.predict:
+        return None
+    return OutputPredictor(configs, args.predict_lead_ms, args.predict_max_ms)
+
+
+def main_camera_pool(args):
+    connection_monitor = ConnectionMonitor()
+
+    def vts_sink(vts_interface):
+        def send(parameter_results):
+            try:
+                vts_interface.send_detection_parameter_results(
+                    parameter_results
+                )
+            except ConnectionClosedOK:
+                connection_monitor.close_connection()
+
+        return send
+
+    vts_interfaces = []
     if args.run_offline is False:
-        vts_interface = VTSInterface(args.address, args.auth_file)
+        addresses = args.address[: len(args.cameras)]
+        for camera_idx, address in enumerate(addresses):
+            vts_interfaces.append(
+                VTSInterface(
+                    address, face_auth_file(args.auth_file, camera_idx)
+                )
+            )
+    sinks = [vts_sink(vts_interface) for vts_interface in vts_interfaces]
+    sinks += [None] * (len(args.cameras) - len(sinks))
+
+    worker_options = [
+        CameraWorkerOptions(
+            camera_id,
+            args.width,
+            args.height,
+            args.fps,
+            args.model,
+            use_gpu=args.use_gpu,
+            fourcc=args.fourcc,
+            buffer_size=args.buffer_size,
+            backend=args.capture_backend,
+            grab_retrieve=args.grab_retrieve,
+            # The GUI shows the first camera
+            send_landmarks=args.run_app and camera_idx == 0,
+        )
+        for camera_idx, camera_id in enumerate(args.cameras)
+    ]
+    pool = CameraPool(worker_options, sinks)
+    # Workers get the coordinator's configs, so its bounds apply to all
+    for vts_interface in vts_interfaces:
+        vts_interface.predictor = create_predictor(
+            args, pool.computer.parameter_configs
+        )
+    if args.run_app:
+        app = Application(args.gui_fps, args.gui_results_fps)
+        pool.computer.on_results = app.notify_results
+        pool.computer.history = create_history(args)
+    pool.start()
+
+    try:
+        while connection_monitor.connection_valid() and pool.alive():
+            if not args.run_app:
+                time.sleep(FRAME_TIMEOUT_SEC)
+            elif app.keep_drawing():
+                app.render_frame(pool.computer)
+            else:
+                print("Window closed, quitting")
+                break
+    except KeyboardInterrupt:
+        print("Keyboard Interrupt, exiting.")
+    except Exception:
+        traceback.print_exc()
+
+    pool.stop()
+    for camera_stats in pool.stats:
+        print(camera_stats)
+    for vts_interface in vts_interfaces:
+        vts_interface.close()
+
+
+def main(args):
+    # Init capture device, replays don't need the camera or mediapipe
+    if args.replay is None:
+        capture = CaptureDevice(
+            args.camera,
+            args.width,
+            args.height,
+            args.fps,
+            fourcc=args.fourcc,
+            buffer_size=args.buffer_size,
+            backend=args.capture_backend,
+            grab_retrieve=args.grab_retrieve,
+        )
+        print(capture.describe())
     else:
-        vts_interface = None
+        replayer = DetectionReplayer(args.replay)
+
+    recorder = None
+    if args.record is not None:
+        recorder = DetectionRecorder(args.record)
+
+    tracer = None
+    if args.trace:
+        tracer = LatencyTracer(
+            last_stage="computed" if args.run_offline else "sent"
+        )
+        tracer.install_signal_handler()
+
+    # Init Websocket Connections, one per face
+    vts_interfaces = []
+    if args.run_offline is False:
+        for face_id, address in enumerate(args.address[: args.num_faces]):
+            vts_interfaces.append(
+                VTSInterface(
+                    address,
+                    face_auth_file(args.auth_file, face_id),
+                    tracer=tracer,
+                )
+            )
+        if len(vts_interfaces) < args.num_faces:
+            print(
+                f"Only {len(vts_interfaces)} of {args.num_faces} faces have "
+                "a VTube Studio address, the others are not sent"
+            )
 
     # Connection Monitor for clean exiting
     connection_monitor = ConnectionMonitor()
 
-    # Create computer
-    parameter_computer = ParameterComputer(save_results=args.run_app)
+    # Create computers, the application and recordings follow face 0
+    face_computer = MultiFaceComputer(
+        args.num_faces,
+        save_results=args.run_app,
+        params_files=args.params_file,
+    )
+    parameter_computer = face_computer.computers[0]
+    # Set before any frame is sent
+    for face_id, vts_interface in enumerate(vts_interfaces):
+        vts_interface.predictor = create_predictor(
+            args, face_computer.computers[face_id].parameter_configs
+        )
+    if args.session_record is not None:
+        parameter_computer.session_recorder = SessionRecorder(
+            args.session_record
+        )
 
     # Create application (if specified)
     if args.run_app:
-        app = Application()
+        app = Application(args.gui_fps, args.gui_results_fps)
+        parameter_computer.on_results = app.notify_results
+        parameter_computer.history = create_history(args)
 
     # Init Mediapipe
-    def callback(detection_results, timestamp):
-        parameter_results = parameter_computer.compute_parameters(
+    def compute_and_send(detection_results, timestamp):
+        face_results = face_computer.compute_parameters(
             detection_results, timestamp
         )
-        if args.run_offline is False:
+        if recorder is not None:
+            recorder.record(
+                detection_results, timestamp, face_computer.face_index(0)
+            )
+        if tracer is not None:
+            tracer.mark(timestamp, "computed")
+        for face_id, parameter_results in face_results:
+            if face_id >= len(vts_interfaces):
+                continue
             try:
-                vts_interface.send_detection_parameter_results(
+                vts_interfaces[face_id].send_detection_parameter_results(
                     parameter_results
                 )
             except ConnectionClosedOK:
                 connection_monitor.close_connection()
 
-    processor = MPProcessor(args.use_gpu, args.model, callback)
+    # Mediapipe's result thread only hands results over to the worker
+    compute_worker = ComputeWorker(compute_and_send)
 
-    def _face_detection_loop():
+    if args.replay is None:
+        roi_cropper = None
+        if args.roi and args.num_faces > 1:
+            print("ROI cropping follows a single face, disabled")
+        elif args.roi:
+            roi_cropper = RoiCropper(args.roi_size, args.roi_padding)
+        processor = MPProcessor(
+            args.use_gpu,
+            args.model,
+            compute_worker.submit,
+            roi_cropper,
+            args.num_faces,
+        )
+        scheduler = DetectionScheduler(processor, FRAME_TIMEOUT_SEC, tracer)
+
+    def _replay_loop():
         try:
+            for result, timestamp in replayer.replay(not args.replay_fast):
+                if not connection_monitor.connection_valid():
+                    break
+                # Replayed frames start their trace at detection
+                if tracer is not None:
+                    tracer.mark(timestamp, "detected")
+                compute_and_send(result, timestamp)
+            else:
+                print("Replay finished")
+                connection_monitor.close_connection()
+        except KeyboardInterrupt:
+            print("Keyboard Interrupt, exiting.")
+            connection_monitor.close_connection()
+        except Exception:
+            traceback.print_exc()
+            connection_monitor.close_connection()
+
+    def _camera_detection_loop():
+        try:
+            compute_worker.start()
+            capture.start()
             while connection_monitor.connection_valid():
-                ret = capture.read_image()
-                if ret.valid is not None:
-                    processor.detect_image(ret.image, ret.timestamp)
-                else:
-                    capture.wait()
+                compute_worker.check()
+                # Only pick a frame once the detector is free, so it is
+                # always the newest one
+                if not scheduler.wait_idle(timeout=FRAME_TIMEOUT_SEC):
+                    continue
+                ret = capture.get_latest(timeout=FRAME_TIMEOUT_SEC)
+                if ret is not None:
+                    scheduler.submit(ret)
         except KeyboardInterrupt:
             print("Keyboard Interrupt, exiting.")
             connection_monitor.close_connection()
         except Exception:
             traceback.print_exc()
             connection_monitor.close_connection()
+        finally:
+            capture.stop()
+            compute_worker.stop()
+            print(f"Capture: {capture.stats}")
+            print(f"Frame conversion: {processor.rgb_buffer.stats}")
+            print(f"Detection: {scheduler.stats}")
+            print(f"Compute: {compute_worker.stats}")
+
+    if args.replay is None:
+        _face_detection_loop = _camera_detection_loop
+    else:
+        _face_detection_loop = _replay_loop
 
     if not args.run_app:
         _face_detection_loop()
@@ -148,7 +528,23 @@ def main(args):
 
         face_detection_thread.join()
 
+    for vts_interface in vts_interfaces:
+        vts_interface.close()
+    face_computer.close()
+
+    if recorder is not None:
+        recorder.close()
+
+    if parameter_computer.session_recorder is not None:
+        parameter_computer.session_recorder.close()
+
+    if tracer is not None:
+        print(tracer.report())
+
 
 if __name__ == "__main__":
     args = get_args()
-    main(args)
+    if args.cameras is not None:
+        main_camera_pool(args)
+    else:
+        main(args)
@@ -0,0 +1,207 @@
+import os
+import time
+from threading import Condition, Thread
+import numpy as np
+from computation.blendshape_names import BLENDSHAPE_NAMES
+from computation.landmark_parser import NUM_LANDMARKS
+
+# Frames per .npz chunk
+CHUNK_FRAMES = 300
+# Full chunks waiting for the writer thread before record() blocks
+MAX_PENDING_CHUNKS = 4
+
+
+class ReplayResult:
+    """Stands in for a FaceLandmarkerResult read back from a recording.
+
+    Landmarks and blendshapes are arrays, which the parameter computer
+    accepts in place of mediapipe's containers.
+    """
+
+    def __init__(self, landmarks, blendshapes, transformation_matrix):
+        self.face_landmarks = [landmarks]
+        self.face_blendshapes = [blendshapes]
+        self.facial_transformation_matrixes = [transformation_matrix]
+
+
+class NoFaceResult:
+    def __init__(self):
+        self.face_landmarks = []
+        self.face_blendshapes = []
+        self.facial_transformation_matrixes = []
+
+
+class DetectionRecorder:
+    """Writes one face of every detection result into .npz chunks.
+
+    A recording is a directory of chunk_NNNNN.npz files, each holding up to
+    CHUNK_FRAMES frames: timestamps, a face_found flag, landmarks
+    (N, 478, 3), blendshapes (N, 52) and transformation matrices
+    (N, 4, 4). Frames without a face are kept so replay preserves timing.
+
+    Full chunks are compressed and written on a writer thread, record()
+    only hands the chunk's buffers over and continues in fresh ones.
+    """
+
+    def __init__(self, path: str, chunk_frames: int = CHUNK_FRAMES):
+        if os.path.exists(path) and len(os.listdir(path)) > 0:
+            raise Exception(f"Recording directory '{path}' is not empty")
+        os.makedirs(path, exist_ok=True)
+        self.path = path
+        self.chunk_frames = chunk_frames
+        self.chunk_idx = 0
+        self.frames = 0
+        self.condition = Condition()
+        self.pending = []
+        self.running = True
+        self.error = None
+        self.allocate()
+        self.writer_thread = Thread(target=self._write_loop, daemon=True)
+        self.writer_thread.start()
+
+    def allocate(self):
+        chunk_frames = self.chunk_frames
+        self.timestamps = np.zeros(chunk_frames, dtype=np.int64)
+        self.face_found = np.zeros(chunk_frames, dtype=bool)
+        self.landmarks = np.zeros(
+            (chunk_frames, NUM_LANDMARKS, 3), dtype=np.float32
+        )
+        self.blendshapes = np.zeros(
+            (chunk_frames, len(BLENDSHAPE_NAMES)), dtype=np.float32
+        )
+        self.matrices = np.zeros((chunk_frames, 4, 4), dtype=np.float32)
+
+    def record(self, detection_result, timestamp, face_idx=0):
+        """Records the detection at face_idx, None records no face."""
+        idx = self.frames
+        self.timestamps[idx] = timestamp
+        found = (
+            face_idx is not None
+            and len(detection_result.face_blendshapes) > face_idx
+        )
+        self.face_found[idx] = found
+        if found:
+            landmarks = detection_result.face_landmarks[face_idx]
+            if isinstance(landmarks, np.ndarray):
+                self.landmarks[idx] = landmarks
+            else:
+                self.landmarks[idx] = [
+                    (landmark.x, landmark.y, landmark.z)
+                    for landmark in landmarks
+                ]
+            blendshapes = detection_result.face_blendshapes[face_idx]
+            if isinstance(blendshapes, np.ndarray):
+                self.blendshapes[idx] = blendshapes
+            else:
+                self.blendshapes[idx] = [
+                    category.score for category in blendshapes
+                ]
+            self.matrices[idx] = (
+                detection_result.facial_transformation_matrixes[face_idx]
+            )
+        self.frames += 1
+        if self.frames == self.chunk_frames:
+            self.flush()
+
+    def flush(self):
+        if self.frames == 0:
+            return
+        n = self.frames
+        chunk = (
+            os.path.join(self.path, f"chunk_{self.chunk_idx:05d}.npz"),
+            {
+                "timestamps": self.timestamps[:n],
+                "face_found": self.face_found[:n],
+                "landmarks": self.landmarks[:n],
+                "blendshapes": self.blendshapes[:n],
+                "matrices": self.matrices[:n],
+            },
+        )
+        with self.condition:
+            self.condition.wait_for(
+                lambda: len(self.pending) < MAX_PENDING_CHUNKS
+                or self.error is not None
+            )
+            if self.error is not None:
+                raise self.error
+            self.pending.append(chunk)
+            self.condition.notify_all()
+        self.chunk_idx += 1
+        self.frames = 0
+        # The writer owns the handed over buffers now
+        self.allocate()
+
+    def close(self):
+        self.flush()
+        with self.condition:
+            self.running = False
+            self.condition.notify_all()
+        self.writer_thread.join()
+        if self.error is not None:
+            raise self.error
+
+    def _write_loop(self):
+        while True:
+            with self.condition:
+                self.condition.wait_for(
+                    lambda: len(self.pending) > 0 or not self.running
+                )
+                if len(self.pending) == 0:
+                    return
+                chunk_path, arrays = self.pending[0]
+            try:
+                np.savez_compressed(chunk_path, **arrays)
+            except Exception as e:
+                # Raised to the compute thread by the next flush or close
+                with self.condition:
+                    self.error = e
+                    self.condition.notify_all()
+                return
+            with self.condition:
+                self.pending.pop(0)
+                self.condition.notify_all()
+
+
+class DetectionReplayer:
+    def __init__(self, path: str):
+        self.chunk_files = sorted(
+            os.path.join(path, file_name)
+            for file_name in os.listdir(path)
+            if file_name.startswith("chunk_") and file_name.endswith(".npz")
+        )
+        if len(self.chunk_files) == 0:
+            raise Exception(f"No recording chunks found in '{path}'")
+
+    def results(self):
+        """Yield (result, timestamp) for every recorded frame in order."""
+        no_face = NoFaceResult()
+        for chunk_file in self.chunk_files:
+            with np.load(chunk_file) as chunk:
+                timestamps = chunk["timestamps"].tolist()
+                face_found = chunk["face_found"]
+                landmarks = chunk["landmarks"]
+                blendshapes = chunk["blendshapes"].astype(np.float64)
+                matrices = chunk["matrices"].astype(np.float64)
+            for idx, timestamp in enumerate(timestamps):
+                if face_found[idx]:
+                    result = ReplayResult(
+                        landmarks[idx], blendshapes[idx], matrices[idx]
+                    )
+                else:
+                    result = no_face
+                yield result, timestamp
+
+    def replay(self, realtime: bool = True):
+        """Like results, but paced by the recorded timestamps if realtime."""
+        start_ns = None
+        first_timestamp = None
+        for result, timestamp in self.results():
+            if realtime:
+                if start_ns is None:
+                    start_ns = time.monotonic_ns()
+                    first_timestamp = timestamp
+                due_ns = start_ns + (timestamp - first_timestamp) * 1_000_000
+                delay_ns = due_ns - time.monotonic_ns()
+                if delay_ns > 0:
+                    time.sleep(delay_ns / 1e9)
+            yield result, timestamp
@@ -0,0 +1,304 @@
+import json
+import os
+import numpy as np
+from computation.blendshape_names import BLENDSHAPE_NAMES
+from computation.landmark_parser import NUM_LANDMARKS
+
+MAGIC = b"LVTSSES1"
+HEADER_BYTES = 4096
+# Frames per block, every block starts with its own index entry
+BLOCK_FRAMES = 1024
+BLOCK_HEADER_DTYPE = np.dtype(
+    [
+        ("frames", "<i8"),
+        ("first_timestamp", "<i8"),
+        ("last_timestamp", "<i8"),
+    ]
+)
+BLOCK_HEADER_BYTES = 64
+COLUMN_ALIGNMENT = 64
+
+
+def session_columns(num_outputs):
+    # (name, dtype, shape of one frame)
+    return [
+        ("timestamp", "<i8", ()),
+        ("landmarks", "<f4", (NUM_LANDMARKS, 3)),
+        ("blendshapes", "<f4", (len(BLENDSHAPE_NAMES),)),
+        ("pose", "<f4", (4, 4)),
+        ("outputs", "<f4", (num_outputs,)),
+    ]
+
+
+def _aligned(num_bytes):
+    return -(-num_bytes // COLUMN_ALIGNMENT) * COLUMN_ALIGNMENT
+
+
+def _empty_column(dtype, shape):
+    return np.empty((0,) + tuple(shape), dtype=dtype)
+
+
+class SessionLayout:
+    """Byte layout of a session segment, shared by writer and reader.
+
+    The file is a fixed size header (magic, JSON schema) followed by
+    fixed size blocks. Each block is a BLOCK_HEADER_BYTES index entry
+    (frame count, first and last timestamp) and then one fixed width
+    column per stream, so a block is found by offset arithmetic and a
+    column inside it is a plain strided view.
+    """
+
+    def __init__(self, output_ids, block_frames=BLOCK_FRAMES):
+        self.output_ids = tuple(output_ids)
+        self.block_frames = block_frames
+        self.columns = session_columns(len(self.output_ids))
+        self.column_offsets = {}
+        offset = BLOCK_HEADER_BYTES
+        for name, dtype, shape in self.columns:
+            self.column_offsets[name] = offset
+            row_bytes = np.dtype(dtype).itemsize * int(np.prod(shape))
+            offset += _aligned(row_bytes * block_frames)
+        self.block_bytes = offset
+
+    def block_offset(self, block_idx):
+        return HEADER_BYTES + block_idx * self.block_bytes
+
+    def header(self):
+        schema = {
+            "block_frames": self.block_frames,
+            "output_ids": list(self.output_ids),
+            "columns": [
+                [name, dtype, list(shape)]
+                for name, dtype, shape in self.columns
+            ],
+        }
+        schema_json = json.dumps(schema).encode()
+        header = MAGIC + len(schema_json).to_bytes(4, "little") + schema_json
+        if len(header) > HEADER_BYTES:
+            raise Exception("Too many outputs for the session header")
+        return header.ljust(HEADER_BYTES, b"\0")
+
+    @classmethod
+    def from_header(cls, header: bytes):
+        if header[: len(MAGIC)] != MAGIC:
+            raise Exception("Not a session recording")
+        start = len(MAGIC) + 4
+        length = int.from_bytes(header[len(MAGIC) : start], "little")
+        schema = json.loads(header[start : start + length])
+        return cls(schema["output_ids"], schema["block_frames"])
+
+    def block_views(self, buffer, block_start=0):
+        """Index entry and column arrays of the block at block_start."""
+        header = np.ndarray(
+            (), BLOCK_HEADER_DTYPE, buffer=buffer, offset=block_start
+        )
+        columns = {}
+        for name, dtype, shape in self.columns:
+            columns[name] = np.ndarray(
+                (self.block_frames,) + tuple(shape),
+                dtype,
+                buffer=buffer,
+                offset=block_start + self.column_offsets[name],
+            )
+        return header, columns
+
+
+class SessionWriter:
+    """Appends frames to a memory-mapped columnar session segment.
+
+    The file grows one block at a time. Per frame the values are copied
+    into the mapped block's column views, so nothing is allocated until
+    the next block is mapped.
+    """
+
+    def __init__(self, path: str, output_ids, block_frames=BLOCK_FRAMES):
+        self.path = path
+        self.layout = SessionLayout(output_ids, block_frames)
+        self.output_ids = output_ids
+        self.file = open(path, "wb+")
+        self.file.write(self.layout.header())
+        self.blocks = 0
+        self.frames = 0
+        self.block = None
+        self.block_header = None
+        self.columns = None
+        self.row = block_frames
+
+    def map_next_block(self):
+        if self.block is not None:
+            self.block.flush()
+        offset = self.layout.block_offset(self.blocks)
+        self.file.truncate(offset + self.layout.block_bytes)
+        self.block = np.memmap(
+            self.file,
+            dtype=np.uint8,
+            mode="r+",
+            offset=offset,
+            shape=(self.layout.block_bytes,),
+        )
+        self.block_header, self.columns = self.layout.block_views(self.block)
+        self.blocks += 1
+        self.row = 0
+
+    def write(self, timestamp, landmarks, blendshapes, pose, outputs):
+        if self.row == self.layout.block_frames:
+            self.map_next_block()
+        row = self.row
+        columns = self.columns
+        columns["timestamp"][row] = timestamp
+        columns["landmarks"][row] = landmarks
+        columns["blendshapes"][row] = blendshapes
+        columns["pose"][row] = pose
+        columns["outputs"][row] = outputs
+        # The index entry is updated last, a torn write isn't counted
+        if row == 0:
+            self.block_header["first_timestamp"] = timestamp
+        self.block_header["last_timestamp"] = timestamp
+        self.block_header["frames"] = row + 1
+        self.row += 1
+        self.frames += 1
+
+    def close(self):
+        if self.block is not None:
+            self.block.flush()
+            self.block = None
+            self.block_header = None
+            self.columns = None
+        self.file.close()
+
+
+class SessionRecorder:
+    """Writes computed frames into a directory of session segments.
+
+    A new segment is started whenever the output ids change, e.g. when a
+    parameter is added in the GUI.
+    """
+
+    def __init__(self, directory: str, block_frames=BLOCK_FRAMES):
+        if os.path.exists(directory) and len(os.listdir(directory)) > 0:
+            raise Exception(f"Session directory '{directory}' is not empty")
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.block_frames = block_frames
+        self.segments = 0
+        self.writer = None
+
+    def write(
+        self, timestamp, landmarks, blendshapes, pose, parameter_outputs
+    ):
+        output_ids = parameter_outputs.output_ids
+        if self.writer is None or self.writer.output_ids != output_ids:
+            self.start_segment(output_ids)
+        self.writer.write(
+            timestamp, landmarks, blendshapes, pose, parameter_outputs.values
+        )
+
+    def start_segment(self, output_ids):
+        if self.writer is not None:
+            self.writer.close()
+        path = os.path.join(
+            self.directory, f"segment_{self.segments:05d}.lvts"
+        )
+        self.writer = SessionWriter(path, output_ids, self.block_frames)
+        self.segments += 1
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+            self.writer = None
+
+
+class SessionSegment:
+    """Random access reads of one session segment through a memory map."""
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, "rb") as fp:
+            self.layout = SessionLayout.from_header(fp.read(HEADER_BYTES))
+        self.output_ids = self.layout.output_ids
+        self.data = np.memmap(path, dtype=np.uint8, mode="r")
+        num_blocks = (len(self.data) - HEADER_BYTES) // self.layout.block_bytes
+        self.blocks = [
+            self.layout.block_views(
+                self.data, self.layout.block_offset(block_idx)
+            )
+            for block_idx in range(num_blocks)
+        ]
+        # Only the index entries are touched to build the block index
+        self.block_frames = np.array(
+            [int(header["frames"]) for header, _ in self.blocks],
+            dtype=np.int64,
+        )
+        self.first_timestamps = np.array(
+            [int(header["first_timestamp"]) for header, _ in self.blocks],
+            dtype=np.int64,
+        )
+        self.last_timestamps = np.array(
+            [int(header["last_timestamp"]) for header, _ in self.blocks],
+            dtype=np.int64,
+        )
+
+    def __len__(self):
+        return int(self.block_frames.sum())
+
+    @property
+    def time_range(self):
+        if len(self) == 0:
+            return None
+        last_block = np.flatnonzero(self.block_frames)[-1]
+        return (
+            int(self.first_timestamps[0]),
+            int(self.last_timestamps[last_block]),
+        )
+
+    def read(self, start_timestamp=None, end_timestamp=None):
+        """Columns for frames with start <= timestamp <= end.
+
+        A range within one block is returned as views into the map, a range
+        spanning blocks is copied into new arrays.
+        """
+        if start_timestamp is None:
+            start_timestamp = np.iinfo(np.int64).min
+        if end_timestamp is None:
+            end_timestamp = np.iinfo(np.int64).max
+        valid = self.block_frames > 0
+        first_block = np.searchsorted(
+            np.where(valid, self.last_timestamps, np.iinfo(np.int64).max),
+            start_timestamp,
+        )
+        last_block = np.searchsorted(
+            np.where(valid, self.first_timestamps, np.iinfo(np.int64).max),
+            end_timestamp,
+            side="right",
+        )
+        parts = []
+        for block_idx in range(first_block, last_block):
+            _, columns = self.blocks[block_idx]
+            frames = int(self.block_frames[block_idx])
+            timestamps = columns["timestamp"][:frames]
+            start = np.searchsorted(timestamps, start_timestamp)
+            end = np.searchsorted(timestamps, end_timestamp, side="right")
+            if end > start:
+                parts.append(
+                    {
+                        name: column[start:end]
+                        for name, column in columns.items()
+                    }
+                )
+        if len(parts) == 1:
+            return parts[0]
+        return {
+            name: np.concatenate(
+                [part[name] for part in parts] or [_empty_column(dtype, shape)]
+            )
+            for name, dtype, shape in self.layout.columns
+        }
+
+
+def open_session(directory: str):
+    """Segments of a recorded session, oldest first."""
+    return [
+        SessionSegment(os.path.join(directory, file_name))
+        for file_name in sorted(os.listdir(directory))
+        if file_name.endswith(".lvts")
+    ]
@@ -0,0 +1,50 @@
+import json
+import numpy as np
+from communication.injection_serializer import InjectParameterSerializer
+
+OUTPUT_IDS = ("MouthOpen", "Eye%Open", 'Brow"L', "FaceAngleX")
+
+
+def baseline_request(request_id, output_ids, values):
+    # The request as VTSInterface built it before the serializer existed
+    return json.dumps(
+        {
+            "apiName": "VTubeStudioPublicAPI",
+            "apiVersion": "1.0",
+            "requestID": request_id,
+            "messageType": "InjectParameterDataRequest",
+            "data": {
+                "faceFound": True,
+                "mode": "add",
+                "parameterValues": [
+                    {"id": output_id, "value": value}
+                    for output_id, value in zip(output_ids, values)
+                ],
+            },
+        }
+    )
+
+
+def test_matches_baseline():
+    serializer = InjectParameterSerializer(OUTPUT_IDS)
+    values = [0.0, -1.5, 1e-20, 12345.678]
+    assert serializer.serialize("request-1", values) == baseline_request(
+        "request-1", OUTPUT_IDS, values
+    )
+
+
+def test_numpy_scalars():
+    serializer = InjectParameterSerializer(OUTPUT_IDS)
+    values = [np.float64(0.25), np.float32(0.5), np.int64(2), 1]
+    expected = baseline_request(
+        "request-2", OUTPUT_IDS, [float(value) for value in values]
+    )
+    assert serializer.serialize("request-2", values) == expected
+
+
+def test_non_finite_values():
+    serializer = InjectParameterSerializer(OUTPUT_IDS)
+    values = [float("nan"), float("inf"), -np.inf, 0.75]
+    message = serializer.serialize("request-3", values)
+    expected = baseline_request("request-3", OUTPUT_IDS, [0.0, 0.0, 0.0, 0.75])
+    assert message == expected
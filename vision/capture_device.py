@@ -1,34 +1,189 @@
 import cv2
 import time
+from threading import Condition, Thread
+from vision.frame_clock import FrameClock
 
 
 class CaptureReturn:
-    def __init__(self, ret, cv2_image, timestamp):
+    def __init__(self, ret, cv2_image, timestamp, frame_index=0, capture_ns=0):
         self.timestamp = timestamp
         self.valid = ret
         self.image = cv2_image
+        # Position in the stream of frames grabbed from the camera
+        self.frame_index = frame_index
+        # time.monotonic_ns when the frame was read from the camera
+        self.capture_ns = capture_ns
+
+
+CAPTURE_BACKENDS = {
+    "any": cv2.CAP_ANY,
+    "v4l2": cv2.CAP_V4L2,
+    "gstreamer": cv2.CAP_GSTREAMER,
+}
+
+
+def decode_fourcc(code):
+    code = int(code)
+    return "".join(chr((code >> (8 * shift)) & 0xFF) for shift in range(4))
+
+
+# Frames timed after startup to report the rate the camera delivers
+FPS_MEASURE_FRAMES = 60
 
 
 class CaptureDevice:
-    def __init__(self, camera_id, width, height, fps):
+    def __init__(
+        self,
+        camera_id,
+        width,
+        height,
+        fps,
+        fourcc: str | None = None,
+        buffer_size: int | None = None,
+        backend: str = "any",
+        grab_retrieve: bool = False,
+    ):
+        # Single slot holding the newest frame from the grab thread
+        self.condition = Condition()
+        self.latest = None
+        # Consumers blocked in get_latest, grab_retrieve decodes for them
+        self.waiting = 0
+        self.frames_captured = 0
+        self.frames_dropped = 0
+        self.frames_skipped = 0
+        self.fps_start = 0.0
+        self.measured_fps = None
+        self.error = None
+        self.running = False
+        self.grab_thread = None
+        self.clock = FrameClock()
+
         self.capture = cv2.VideoCapture()
-        self.capture.set(cv2.CAP_PROP_FRAME_WIDTH, width)
-        self.capture.set(cv2.CAP_PROP_FRAME_HEIGHT, height)
-        self.capture.set(cv2.CAP_PROP_FPS, fps)
-        self.capture.open(camera_id)
+        self.capture.open(camera_id, CAPTURE_BACKENDS[backend])
 
         if self.capture.isOpened() is False:
             raise Exception(f"Failed to open camera ID: {camera_id}")
 
+        # V4L2 picks the frame sizes and rates available for the current
+        # pixel format, so FOURCC has to be set before anything else
+        if fourcc is not None:
+            self.capture.set(
+                cv2.CAP_PROP_FOURCC, cv2.VideoWriter_fourcc(*fourcc)
+            )
+        self.capture.set(cv2.CAP_PROP_FRAME_WIDTH, width)
+        self.capture.set(cv2.CAP_PROP_FRAME_HEIGHT, height)
+        self.capture.set(cv2.CAP_PROP_FPS, fps)
+        if buffer_size is not None:
+            self.capture.set(cv2.CAP_PROP_BUFFERSIZE, buffer_size)
+
         self.fps = self.capture.get(cv2.CAP_PROP_FPS)
-        self.width = width
-        self.height = height
+        self.width = int(self.capture.get(cv2.CAP_PROP_FRAME_WIDTH))
+        self.height = int(self.capture.get(cv2.CAP_PROP_FRAME_HEIGHT))
+        self.fourcc = decode_fourcc(self.capture.get(cv2.CAP_PROP_FOURCC))
+        self.backend_name = self.capture.getBackendName()
         self.camera_id = camera_id
         self.wait_interval_sec = 0.1 / fps
+        # Grab every frame but only decode the ones a consumer waits for
+        self.grab_retrieve = grab_retrieve
 
     def __del__(self):
+        self.stop()
         self.capture.release()
 
+    def start(self):
+        if self.grab_thread is not None:
+            return
+        self.running = True
+        self.grab_thread = Thread(target=self._grab_loop, daemon=True)
+        self.grab_thread.start()
+
+    def stop(self):
+        if self.grab_thread is None:
+            return
+        with self.condition:
+            self.running = False
+            self.condition.notify_all()
+        self.grab_thread.join()
+        self.grab_thread = None
+
+    @property
+    def stats(self):
+        with self.condition:
+            return {
+                "captured": self.frames_captured,
+                "dropped": self.frames_dropped,
+                "skipped": self.frames_skipped,
+                "timestamps": self.clock.stats,
+            }
+
+    def describe(self):
+        return (
+            f"Camera {self.camera_id} ({self.backend_name}): "
+            f"{self.width}x{self.height} {self.fourcc} "
+            f"@ {self.fps:.1f} fps"
+        )
+
+    def update_measured_fps(self):
+        # Report the delivered frame rate once, after the camera warmed up
+        frames = self.frames_captured + self.frames_skipped
+        if frames == 1:
+            self.fps_start = time.monotonic()
+        elif frames == FPS_MEASURE_FRAMES + 1:
+            elapsed = time.monotonic() - self.fps_start
+            self.measured_fps = FPS_MEASURE_FRAMES / elapsed
+            print(
+                f"Camera {self.camera_id} measured rate: "
+                f"{self.measured_fps:.1f} fps"
+            )
+
+    def _grab_loop(self):
+        while self.running:
+            try:
+                if self.grab_retrieve:
+                    capture_return = self.grab_image()
+                    if capture_return is None:
+                        self.update_measured_fps()
+                        continue
+                else:
+                    capture_return = self.read_image()
+            except Exception as e:
+                with self.condition:
+                    self.error = e
+                    self.running = False
+                    self.condition.notify_all()
+                return
+            if not capture_return.valid:
+                self.wait()
+                continue
+            with self.condition:
+                # Frames nobody picked up are replaced by the newer one
+                if self.latest is not None:
+                    self.frames_dropped += 1
+                capture_return.frame_index = (
+                    self.frames_captured + self.frames_skipped
+                )
+                self.latest = capture_return
+                self.frames_captured += 1
+                self.condition.notify_all()
+            self.update_measured_fps()
+
+    def get_latest(self, timeout: float | None = None):
+        """Block until a frame newer than the last one returned arrives.
+
+        Returns None if no frame arrived within the timeout.
+        """
+        with self.condition:
+            self.waiting += 1
+            self.condition.wait_for(
+                lambda: self.latest is not None or not self.running, timeout
+            )
+            self.waiting -= 1
+            if self.error is not None:
+                raise self.error
+            capture_return = self.latest
+            self.latest = None
+            return capture_return
+
     def wait(self):
         time.sleep(self.wait_interval_sec)
 
@@ -37,6 +192,41 @@ class CaptureDevice:
             raise Exception("Could not detect new frame, camera device closed")
 
         ret, cv2_image = self.capture.read()
-        timestamp = int(self.capture.get(cv2.CAP_PROP_POS_MSEC))
-        capture_return = CaptureReturn(ret, cv2_image, timestamp)
+        capture_ns = time.monotonic_ns()
+        timestamp = self.stamp(ret, capture_ns)
+        capture_return = CaptureReturn(
+            ret, cv2_image, timestamp, capture_ns=capture_ns
+        )
         return capture_return
+
+    def stamp(self, ret, capture_ns):
+        if not ret:
+            return None
+        camera_ms = self.capture.get(cv2.CAP_PROP_POS_MSEC)
+        return self.clock.stamp(camera_ms, capture_ns)
+
+    def grab_image(self):
+        """Grab a frame, decoding it only if a consumer is waiting.
+
+        Returns None when the frame was skipped without decoding. A frame
+        still in the slot is older than the skipped one and is dropped,
+        so the next consumer gets the next grab instead.
+        """
+        if self.capture.isOpened() is False:
+            raise Exception("Could not detect new frame, camera device closed")
+
+        ret = self.capture.grab()
+        capture_ns = time.monotonic_ns()
+        timestamp = self.stamp(ret, capture_ns)
+        if ret:
+            with self.condition:
+                if self.waiting == 0:
+                    self.frames_skipped += 1
+                    if self.latest is not None:
+                        self.latest = None
+                        self.frames_dropped += 1
+                    return None
+        cv2_image = None
+        if ret:
+            ret, cv2_image = self.capture.retrieve()
+        return CaptureReturn(ret, cv2_image, timestamp, capture_ns=capture_ns)
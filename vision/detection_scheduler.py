@@ -0,0 +1,120 @@
+import time
+from threading import Condition
+from diagnostics.latency_tracer import LatencyTracer
+from vision.capture_device import CaptureReturn
+from vision.mp_processor import MPProcessor
+
+
+class DetectionScheduler:
+    """Keeps at most one frame in flight in the LIVE_STREAM detector.
+
+    A frame is only submitted once the result for the previous one came
+    back through the processor's callback. Frames the camera delivered in
+    the meantime are never handed to mediapipe, so they are counted here
+    instead of being dropped silently inside the graph.
+    """
+
+    def __init__(
+        self,
+        processor: MPProcessor,
+        stale_timeout_sec=1.0,
+        tracer: LatencyTracer | None = None,
+    ):
+        self.processor = processor
+        self.stale_timeout_sec = stale_timeout_sec
+        self.tracer = tracer
+        self.result_callback = processor.result_callback
+        processor.result_callback = self.process_results
+
+        self.condition = Condition()
+        self.in_flight_timestamp = None
+        self.in_flight_since = 0.0
+        self.in_flight_capture_ns = 0
+        self.last_frame_index = None
+
+        self.submitted = 0
+        self.completed = 0
+        self.skipped = 0
+        self.lost = 0
+        # Camera read to result callback, per completed frame
+        self.last_latency_ms = None
+        self.max_latency_ms = 0.0
+        self.total_latency_ms = 0.0
+
+    @property
+    def stats(self):
+        with self.condition:
+            return {
+                "submitted": self.submitted,
+                "completed": self.completed,
+                "skipped": self.skipped,
+                "lost": self.lost,
+                "last_latency_ms": self.last_latency_ms,
+                "mean_latency_ms": self.total_latency_ms
+                / max(self.completed, 1),
+                "max_latency_ms": self.max_latency_ms,
+            }
+
+    def wait_idle(self, timeout: float | None = None):
+        """Block until no frame is in flight, returns False on timeout."""
+        with self.condition:
+            idle = self.condition.wait_for(
+                lambda: self.in_flight_timestamp is None, timeout
+            )
+            if not idle and self.is_stale():
+                # The result never came back, don't stall the pipeline
+                self.lost += 1
+                self.in_flight_timestamp = None
+                idle = True
+            return idle
+
+    def is_stale(self):
+        elapsed = time.monotonic() - self.in_flight_since
+        return elapsed > self.stale_timeout_sec
+
+    def submit(self, capture_return: CaptureReturn):
+        with self.condition:
+            if self.in_flight_timestamp is not None:
+                raise Exception("A frame is already in flight")
+            if self.last_frame_index is not None:
+                self.skipped += (
+                    capture_return.frame_index - self.last_frame_index - 1
+                )
+            self.last_frame_index = capture_return.frame_index
+            self.in_flight_timestamp = capture_return.timestamp
+            self.in_flight_since = time.monotonic()
+            self.in_flight_capture_ns = capture_return.capture_ns
+            self.submitted += 1
+        if self.tracer is not None:
+            self.tracer.mark(
+                capture_return.timestamp, "capture", capture_return.capture_ns
+            )
+            self.tracer.mark(capture_return.timestamp, "submit")
+        try:
+            self.processor.detect_image(
+                capture_return.image, capture_return.timestamp
+            )
+        except Exception:
+            with self.condition:
+                self.in_flight_timestamp = None
+                self.condition.notify_all()
+            raise
+
+    def record_latency(self, now_ns):
+        latency_ms = (now_ns - self.in_flight_capture_ns) / 1e6
+        self.last_latency_ms = latency_ms
+        self.max_latency_ms = max(self.max_latency_ms, latency_ms)
+        self.total_latency_ms += latency_ms
+
+    def process_results(self, detection_result, timestamp_ms):
+        if self.tracer is not None:
+            self.tracer.mark(timestamp_ms, "detected")
+        # The detector is free again, the next frame can be submitted while
+        # the parameters for this one are computed
+        with self.condition:
+            if self.in_flight_timestamp == timestamp_ms:
+                self.record_latency(time.monotonic_ns())
+                self.in_flight_timestamp = None
+                self.condition.notify_all()
+            self.completed += 1
+        self.result_callback(detection_result, timestamp_ms)
@@ -0,0 +1,69 @@
+# Largest disagreement between the camera clock and the monotonic clock
+# before the camera timestamps are no longer trusted
+MAX_CAMERA_DRIFT_MS = 500
+
+
+class FrameClock:
+    """Millisecond frame timestamps for mediapipe's LIVE_STREAM mode.
+
+    Camera timestamps (CAP_PROP_POS_MSEC) are used when they are positive,
+    increasing and advance at the same rate as the monotonic clock. They
+    are shifted onto the monotonic timebase so switching between the two
+    sources doesn't jump. Otherwise time.monotonic_ns is used. Timestamps
+    returned are always strictly increasing, as detect_async requires.
+    """
+
+    def __init__(self, max_drift_ms=MAX_CAMERA_DRIFT_MS):
+        self.max_drift_ms = max_drift_ms
+        self.camera_offset_ms = None
+        self.last_camera_ms = None
+        self.last_timestamp_ms = None
+        self.camera_frames = 0
+        self.monotonic_frames = 0
+        self.resyncs = 0
+        self.bumped = 0
+
+    @property
+    def stats(self):
+        return {
+            "camera": self.camera_frames,
+            "monotonic": self.monotonic_frames,
+            "resyncs": self.resyncs,
+            "bumped": self.bumped,
+        }
+
+    def stamp(self, camera_ms: float, capture_ns: int):
+        monotonic_ms = capture_ns // 1_000_000
+        timestamp_ms = self.camera_timestamp(camera_ms, monotonic_ms)
+        if timestamp_ms is None:
+            timestamp_ms = monotonic_ms
+            self.monotonic_frames += 1
+        else:
+            self.camera_frames += 1
+
+        if (
+            self.last_timestamp_ms is not None
+            and timestamp_ms <= self.last_timestamp_ms
+        ):
+            timestamp_ms = self.last_timestamp_ms + 1
+            self.bumped += 1
+        self.last_timestamp_ms = timestamp_ms
+        return timestamp_ms
+
+    def camera_timestamp(self, camera_ms: float, monotonic_ms: int):
+        last_camera_ms = self.last_camera_ms
+        self.last_camera_ms = camera_ms
+        if camera_ms <= 0 or (
+            last_camera_ms is not None and camera_ms <= last_camera_ms
+        ):
+            return None
+
+        if self.camera_offset_ms is None:
+            self.camera_offset_ms = monotonic_ms - int(camera_ms)
+        timestamp_ms = int(camera_ms) + self.camera_offset_ms
+        if abs(timestamp_ms - monotonic_ms) > self.max_drift_ms:
+            # Camera clock restarted or runs at a different rate
+            self.camera_offset_ms = None
+            self.resyncs += 1
+            return None
+        return timestamp_ms
@@ -0,0 +1,37 @@
+import cv2
+import numpy as np
+
+
+class RgbFrameBuffer:
+    """Converts BGR camera frames to RGB into reused buffers.
+
+    mp.Image copies the pixels it is given into its own packet, so the
+    buffer can be overwritten by the next frame as soon as the image is
+    constructed. One buffer is kept per frame size, so switching between
+    the ROI crop and the full frame does not allocate either.
+    """
+
+    def __init__(self):
+        self.buffers = {}
+        self.frames = 0
+        self.allocations = 0
+        self.bytes_allocated = 0
+
+    def convert(self, bgr_image: np.ndarray):
+        buffer = self.buffers.get(bgr_image.shape)
+        if buffer is None:
+            buffer = np.empty(bgr_image.shape, dtype=np.uint8)
+            self.buffers[bgr_image.shape] = buffer
+            self.allocations += 1
+            self.bytes_allocated += buffer.nbytes
+        cv2.cvtColor(bgr_image, cv2.COLOR_BGR2RGB, dst=buffer)
+        self.frames += 1
+        return buffer
+
+    @property
+    def stats(self):
+        return {
+            "frames": self.frames,
+            "allocations": self.allocations,
+            "bytes_allocated": self.bytes_allocated,
+        }
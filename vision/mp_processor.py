@@ -1,10 +1,19 @@
 import mediapipe as mp
 from mediapipe.tasks import python
 from mediapipe.tasks.python import vision
+from vision.frame_converter import RgbFrameBuffer
+from vision.roi_cropper import RoiCropper
 
 
 class MPProcessor:
-    def __init__(self, use_gpu: bool, model: str, result_callback):
+    def __init__(
+        self,
+        use_gpu: bool,
+        model: str,
+        result_callback,
+        roi_cropper: RoiCropper | None = None,
+        num_faces: int = 1,
+    ):
         delegate = python.BaseOptions.Delegate.CPU
         if use_gpu:
             delegate = python.BaseOptions.Delegate.GPU
@@ -14,21 +23,27 @@ class MPProcessor:
         )
 
         self.result_callback = result_callback
+        self.roi_cropper = roi_cropper
+        self.rgb_buffer = RgbFrameBuffer()
 
         options = vision.FaceLandmarkerOptions(
             base_options,
             running_mode=mp.tasks.vision.RunningMode.LIVE_STREAM,
             output_face_blendshapes=True,
             output_facial_transformation_matrixes=True,
-            num_faces=1,
+            num_faces=num_faces,
             result_callback=self.process_results,
         )
 
         self.detector = vision.FaceLandmarker.create_from_options(options)
 
     def detect_image(self, input_image, timestamp_ms):
+        if self.roi_cropper is not None:
+            input_image = self.roi_cropper.crop(input_image, timestamp_ms)
+        # Camera frames are BGR, the model expects RGB
+        rgb_image = self.rgb_buffer.convert(input_image)
         formatted_image = mp.Image(
-            image_format=mp.ImageFormat.SRGB, data=input_image
+            image_format=mp.ImageFormat.SRGB, data=rgb_image
         )
         self.detector.detect_async(formatted_image, timestamp_ms)
 
@@ -38,4 +53,6 @@ class MPProcessor:
         _: mp.Image,
         timestamp_ms: int,
     ):
+        if self.roi_cropper is not None:
+            self.roi_cropper.map_result(detection_result, timestamp_ms)
         self.result_callback(detection_result, timestamp_ms)
@@ -0,0 +1,157 @@
+import math
+from threading import Lock
+import cv2
+import numpy as np
+
+# Vertical field of view of mediapipe's face geometry perspective camera
+MP_VERTICAL_FOV_DEGREES = 63.0
+
+
+class RoiTransform:
+    """Placement of the inference image inside the full camera frame."""
+
+    def __init__(self, x0, y0, size_x, size_y, frame_width, frame_height):
+        self.x0 = x0
+        self.y0 = y0
+        self.size_x = size_x
+        self.size_y = size_y
+        self.frame_width = frame_width
+        self.frame_height = frame_height
+
+    @property
+    def is_full_frame(self):
+        return (
+            self.x0 == 0
+            and self.y0 == 0
+            and self.size_x == self.frame_width
+            and self.size_y == self.frame_height
+        )
+
+
+class RoiCropper:
+    """Crops a padded square around the last detected face for inference.
+
+    Landmarks in results are mapped back to full frame normalized
+    coordinates, and replaced with a (N, 3) float32 array. Without a face
+    in the previous result the full frame is used.
+    """
+
+    def __init__(self, inference_size: int = 320, padding: float = 0.5):
+        self.inference_size = inference_size
+        self.padding = padding
+        self.box = None
+        self.transforms = {}
+        # Reused by every crop, the caller converts it before the next one
+        self.resized = np.empty(
+            (inference_size, inference_size, 3), dtype=np.uint8
+        )
+        self.lock = Lock()
+        self.half_height_at_near = math.tan(
+            math.radians(MP_VERTICAL_FOV_DEGREES) / 2.0
+        )
+
+    def crop(self, image, timestamp_ms):
+        frame_height, frame_width = image.shape[:2]
+        with self.lock:
+            box = self.box
+        if box is None:
+            transform = RoiTransform(
+                0, 0, frame_width, frame_height, frame_width, frame_height
+            )
+            roi_image = image
+        else:
+            x0, y0, size = self.clamp_box(box, frame_width, frame_height)
+            transform = RoiTransform(
+                x0, y0, size, size, frame_width, frame_height
+            )
+            roi_image = cv2.resize(
+                image[y0 : y0 + size, x0 : x0 + size],
+                (self.inference_size, self.inference_size),
+                dst=self.resized,
+                interpolation=cv2.INTER_AREA,
+            )
+        with self.lock:
+            self.transforms[timestamp_ms] = transform
+        return roi_image
+
+    def clamp_box(self, box, frame_width, frame_height):
+        center_x, center_y, size = box
+        size = int(min(size, frame_width, frame_height))
+        x0 = int(round(center_x - size / 2))
+        y0 = int(round(center_y - size / 2))
+        x0 = min(max(x0, 0), frame_width - size)
+        y0 = min(max(y0, 0), frame_height - size)
+        return x0, y0, size
+
+    def map_result(self, detection_result, timestamp_ms):
+        with self.lock:
+            transform = self.transforms.pop(timestamp_ms, None)
+            # Results for older timestamps were dropped by mediapipe
+            for stale in [ts for ts in self.transforms if ts < timestamp_ms]:
+                del self.transforms[stale]
+
+        if len(detection_result.face_landmarks) == 0 or transform is None:
+            with self.lock:
+                self.box = None
+            return detection_result
+
+        face_landmarks = detection_result.face_landmarks
+        matrixes = detection_result.facial_transformation_matrixes
+        for face_idx, landmarks in enumerate(face_landmarks):
+            points = np.array(
+                [
+                    (landmark.x, landmark.y, landmark.z)
+                    for landmark in landmarks
+                ],
+                dtype=np.float32,
+            )
+            if not transform.is_full_frame:
+                self.map_points(points, transform)
+            face_landmarks[face_idx] = points
+        if not transform.is_full_frame:
+            for face_idx, matrix in enumerate(matrixes):
+                matrixes[face_idx] = self.map_transformation_matrix(
+                    matrix, transform
+                )
+
+        self.update_box(detection_result.face_landmarks[0], transform)
+        return detection_result
+
+    def map_points(self, points, transform: RoiTransform):
+        points[:, 0] *= transform.size_x / transform.frame_width
+        points[:, 0] += transform.x0 / transform.frame_width
+        points[:, 1] *= transform.size_y / transform.frame_height
+        points[:, 1] += transform.y0 / transform.frame_height
+        # z uses the same scale as x
+        points[:, 2] *= transform.size_x / transform.frame_width
+
+    def map_transformation_matrix(self, matrix, transform: RoiTransform):
+        # Approximate: re-project the face origin through the full frame
+        # camera. The rotation is kept as estimated in the crop.
+        matrix = np.array(matrix, dtype=np.float64)
+        roi_aspect = transform.size_x / transform.size_y
+        frame_aspect = transform.frame_width / transform.frame_height
+        depth = -matrix[2, 3]
+        if depth <= 0:
+            return matrix
+        half_height = self.half_height_at_near
+        u = 0.5 + matrix[0, 3] / (2 * half_height * roi_aspect * depth)
+        v = 0.5 - matrix[1, 3] / (2 * half_height * depth)
+        u = (transform.x0 + u * transform.size_x) / transform.frame_width
+        v = (transform.y0 + v * transform.size_y) / transform.frame_height
+        depth *= transform.frame_height / transform.size_y
+        matrix[0, 3] = (u - 0.5) * 2 * half_height * frame_aspect * depth
+        matrix[1, 3] = (0.5 - v) * 2 * half_height * depth
+        matrix[2, 3] = -depth
+        return matrix
+
+    def update_box(self, points, transform: RoiTransform):
+        min_x, min_y = points[:, :2].min(axis=0)
+        max_x, max_y = points[:, :2].max(axis=0)
+        width = (max_x - min_x) * transform.frame_width
+        height = (max_y - min_y) * transform.frame_height
+        center_x = (min_x + max_x) / 2 * transform.frame_width
+        center_y = (min_y + max_y) / 2 * transform.frame_height
+        size = max(width, height) * (1 + 2 * self.padding)
+        with self.lock:
+            self.box = (float(center_x), float(center_y), float(size))
@@ -0,0 +1,177 @@
+import multiprocessing
+import traceback
+from multiprocessing.connection import wait
+from threading import Lock, Thread
+import numpy as np
+from computation.blendshape_names import BLENDSHAPE_NAMES
+from computation.compute_parameters import (
+    ParameterComputer,
+    ParameterOutputs,
+)
+from computation.landmark_parser import NUM_LANDMARKS, LandmarkSets
+from workers.camera_worker import CameraWorkerOptions, run_camera_worker
+
+# How long a worker gets to exit after being asked to stop
+WORKER_STOP_TIMEOUT_SEC = 5.0
+# How often the reader checks for config edits when no frames arrive
+POLL_INTERVAL_SEC = 0.1
+
+
+class CameraPool:
+    """Runs capture, mediapipe and parameter computation per camera in its
+    own process and fans their parameter frames in to the coordinator.
+
+    Each frame is handed to the camera's sink, e.g. the send method of its
+    VTSInterface. The first camera is mirrored into `computer` so the GUI
+    can show it and tune the shared parameter configs, which are pushed
+    to every worker whenever they change. A sink that raises is dropped,
+    the other cameras keep being sent.
+    """
+
+    def __init__(self, worker_options: list[CameraWorkerOptions], sinks):
+        self.worker_options = worker_options
+        self.sinks = sinks
+        self.computer = ParameterComputer(save_results=True)
+        self.synced_revision = None
+        self.connections = []
+        self.processes = []
+        self.output_ids = [()] * len(worker_options)
+        self.frames = [0] * len(worker_options)
+        self.worker_stats = [None] * len(worker_options)
+        self.running = False
+        self.reader_thread = None
+        # stop() runs on the main thread, sync_configs() on the reader
+        self.send_lock = Lock()
+
+    def start(self):
+        # Forked children would inherit mediapipe and websocket threads
+        context = multiprocessing.get_context("spawn")
+        for camera_idx, options in enumerate(self.worker_options):
+            parent_connection, child_connection = context.Pipe()
+            process = context.Process(
+                target=run_camera_worker,
+                args=(options, child_connection),
+                name=f"camera-{options.camera_id}",
+                daemon=True,
+            )
+            process.start()
+            child_connection.close()
+            self.connections.append(parent_connection)
+            self.processes.append(process)
+        self.running = True
+        self.sync_configs()
+        self.reader_thread = Thread(target=self._read_loop, daemon=True)
+        self.reader_thread.start()
+
+    def alive(self):
+        return (
+            self.reader_thread is not None
+            and self.reader_thread.is_alive()
+            and any(process.is_alive() for process in self.processes)
+        )
+
+    def send(self, message):
+        with self.send_lock:
+            for connection in self.connections:
+                if not connection.closed:
+                    try:
+                        connection.send(message)
+                    except (BrokenPipeError, OSError):
+                        pass
+
+    def sync_configs(self):
+        configs = self.computer.parameter_configs
+        if configs.revision == self.synced_revision:
+            return
+        self.synced_revision = configs.revision
+        self.send(("configs", configs.serialize()))
+
+    def _read_loop(self):
+        camera_idxs = {
+            connection: camera_idx
+            for camera_idx, connection in enumerate(self.connections)
+        }
+        open_connections = list(self.connections)
+        while self.running and len(open_connections) > 0:
+            self.sync_configs()
+            for connection in wait(open_connections, POLL_INTERVAL_SEC):
+                camera_idx = camera_idxs[connection]
+                try:
+                    message = connection.recv()
+                except (EOFError, OSError):
+                    open_connections.remove(connection)
+                    continue
+                try:
+                    self.handle_message(camera_idx, message)
+                except Exception:
+                    # A bad message must not stop the other cameras
+                    traceback.print_exc()
+
+    def handle_message(self, camera_idx, message):
+        match message[0]:
+            case "output_ids":
+                self.output_ids[camera_idx] = message[1]
+            case "frame":
+                _, timestamp, values, landmarks, blendshapes = message
+                self.frames[camera_idx] += 1
+                outputs = ParameterOutputs(
+                    self.output_ids[camera_idx],
+                    np.frombuffer(values, dtype=np.float64).tolist(),
+                    timestamp,
+                )
+                sink = self.sinks[camera_idx]
+                if sink is not None:
+                    try:
+                        sink(outputs)
+                    except Exception:
+                        traceback.print_exc()
+                        camera_id = self.worker_options[camera_idx].camera_id
+                        print(f"Camera {camera_id} is no longer sent")
+                        self.sinks[camera_idx] = None
+                if landmarks is not None:
+                    self.mirror_results(
+                        outputs, landmarks, blendshapes, timestamp
+                    )
+            case "stats":
+                self.worker_stats[camera_idx] = message[1]
+            case "error":
+                camera_id = self.worker_options[camera_idx].camera_id
+                print(f"Camera {camera_id} worker failed:\n{message[1]}")
+
+    def mirror_results(self, outputs, landmarks, blendshapes, timestamp):
+        points = np.frombuffer(landmarks, dtype=np.float32).reshape(
+            NUM_LANDMARKS, 3
+        )
+        scores = np.frombuffer(blendshapes, dtype=np.float64)
+        if len(scores) != len(BLENDSHAPE_NAMES):
+            return
+        self.computer.store_results(
+            outputs, LandmarkSets(points), scores, timestamp
+        )
+
+    @property
+    def stats(self):
+        return [
+            {
+                "camera": options.camera_id,
+                "frames": frames,
+                "worker": worker_stats,
+            }
+            for options, frames, worker_stats in zip(
+                self.worker_options, self.frames, self.worker_stats
+            )
+        ]
+
+    def stop(self):
+        self.send(("stop",))
+        for process in self.processes:
+            process.join(WORKER_STOP_TIMEOUT_SEC)
+            if process.is_alive():
+                process.terminate()
+        # The reader exits once it read every worker's final messages
+        if self.reader_thread is not None:
+            self.reader_thread.join(WORKER_STOP_TIMEOUT_SEC)
+        self.running = False
+        with self.send_lock:
+            for connection in self.connections:
+                connection.close()
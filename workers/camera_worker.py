@@ -0,0 +1,160 @@
+import traceback
+from threading import Event, Thread
+import numpy as np
+from computation.compute_parameters import ParameterComputer
+from computation.compute_worker import ComputeWorker
+from computation.parameter_config import ParameterConfigs
+from vision.capture_device import CaptureDevice
+from vision.detection_scheduler import DetectionScheduler
+from vision.mp_processor import MPProcessor
+
+# How long the detection loop waits for a frame before checking for stop
+FRAME_TIMEOUT_SEC = 1.0
+
+
+class CameraWorkerOptions:
+    """Picklable settings a worker process needs to open its pipeline."""
+
+    def __init__(
+        self,
+        camera_id,
+        width,
+        height,
+        fps,
+        model,
+        use_gpu=False,
+        fourcc=None,
+        buffer_size=None,
+        backend="any",
+        grab_retrieve=False,
+        send_landmarks=False,
+    ):
+        self.camera_id = camera_id
+        self.width = width
+        self.height = height
+        self.fps = fps
+        self.model = model
+        self.use_gpu = use_gpu
+        self.fourcc = fourcc
+        self.buffer_size = buffer_size
+        self.backend = backend
+        self.grab_retrieve = grab_retrieve
+        # Only needed when the coordinator shows this camera in the GUI
+        self.send_landmarks = send_landmarks
+
+
+# Messages from a worker, the first element is the message type:
+#   ("output_ids", output_ids)
+#   ("frame", timestamp, values, landmarks, blendshapes), values is
+#     float64 bytes, landmarks and blendshapes are bytes or None
+#   ("stats", stats dict)
+#   ("error", formatted traceback)
+# Messages to a worker:
+#   ("configs", ParameterConfigs.serialize() dict)
+#   ("stop",)
+
+
+def run_camera_worker(options: CameraWorkerOptions, connection):
+    """Entry point of a camera worker process."""
+    stop = Event()
+    computer = ParameterComputer()
+    sent_output_ids = None
+    # Applied by the compute worker, so configs never change mid frame
+    pending_configs = None
+
+    def receive_loop():
+        nonlocal pending_configs
+        try:
+            while not stop.is_set():
+                message = connection.recv()
+                match message[0]:
+                    case "configs":
+                        pending_configs = ParameterConfigs.from_dict(
+                            message[1]
+                        )
+                    case "stop":
+                        stop.set()
+        except (EOFError, OSError):
+            # Coordinator went away
+            stop.set()
+
+    def compute_and_send(detection_results, timestamp):
+        nonlocal sent_output_ids, pending_configs
+        if pending_configs is not None:
+            computer.parameter_configs = pending_configs
+            pending_configs = None
+        outputs = computer.compute_parameters(detection_results, timestamp)
+        if len(outputs) == 0:
+            return
+        if outputs.output_ids is not sent_output_ids:
+            connection.send(("output_ids", outputs.output_ids))
+            sent_output_ids = outputs.output_ids
+        landmarks = None
+        blendshapes = None
+        if options.send_landmarks:
+            landmarks = np.asarray(
+                computer.results.landmarks.points, dtype=np.float32
+            ).tobytes()
+            blendshapes = computer.results.blendshapes.tobytes()
+        connection.send(
+            (
+                "frame",
+                timestamp,
+                np.array(outputs.values, dtype=np.float64).tobytes(),
+                landmarks,
+                blendshapes,
+            )
+        )
+
+    try:
+        computer.save_results = options.send_landmarks
+        capture = CaptureDevice(
+            options.camera_id,
+            options.width,
+            options.height,
+            options.fps,
+            fourcc=options.fourcc,
+            buffer_size=options.buffer_size,
+            backend=options.backend,
+            grab_retrieve=options.grab_retrieve,
+        )
+        print(capture.describe())
+        compute_worker = ComputeWorker(compute_and_send)
+        processor = MPProcessor(
+            options.use_gpu, options.model, compute_worker.submit
+        )
+        scheduler = DetectionScheduler(processor, FRAME_TIMEOUT_SEC)
+        Thread(target=receive_loop, daemon=True).start()
+
+        compute_worker.start()
+        capture.start()
+        try:
+            while not stop.is_set():
+                compute_worker.check()
+                if not scheduler.wait_idle(timeout=FRAME_TIMEOUT_SEC):
+                    continue
+                ret = capture.get_latest(timeout=FRAME_TIMEOUT_SEC)
+                if ret is not None:
+                    scheduler.submit(ret)
+        finally:
+            capture.stop()
+            compute_worker.stop()
+            connection.send(
+                (
+                    "stats",
+                    {
+                        "capture": capture.stats,
+                        "detection": scheduler.stats,
+                        "compute": compute_worker.stats,
+                    },
+                )
+            )
+    except KeyboardInterrupt:
+        pass
+    except Exception:
+        try:
+            connection.send(("error", traceback.format_exc()))
+        except (BrokenPipeError, OSError):
+            pass
+    finally:
+        connection.close()